@@ -4,122 +4,69 @@ CrewAI Agents for Atomberg Share of Voice Analysis
 Clean, working implementation with LangChain and CrewAI
 """
 
-from crewai import Agent, Task, Crew, Process
-from langchain_ollama import OllamaLLM
 from typing import List, Dict, Any
 import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from tools.youtube_scraper import search_youtube_videos
+from tools.sov_analysis import (
+    analyze_sov_simple, simple_sentiment_analysis, build_sov_summary, clean_comment_text
+)
+from tools.brand_matcher import BrandMatcher
+from tools.comment_filter import CommentFilter
+from tools.api_cache import ApiCache
+from tools.profiling import get_profile, span, count, write_profile
 import config
 
+# CrewAI is imported when the LLM or a crew is first built, so the summary
+# and caching logic can be used and checked without it
+
 class SoVAnalysisAgent:
     """CrewAI-based Share of Voice Analysis Agent"""
     
-    def __init__(self):
-        # Initialize Ollama LLM with correct format for CrewAI
-        self.llm = OllamaLLM(
-            base_url=config.OLLAMA_BASE_URL,
-            model="ollama/gemma3:1b",  # Use the full model name format
-            temperature=0.7
-        )
+    def __init__(self, llm=None, llm_cache: ApiCache = None, crew_runner=None):
+        if llm is None:
+            from crewai import LLM
+            # CrewAI's own LLM, since agents rebuild any other LLM object from
+            # its model name and drop client settings such as the timeout.
+            # Requests go through LiteLLM's HTTP client, not the shared API
+            # session; run_brand_stages' thread pool caps how many are in flight
+            llm = LLM(
+                model=f"ollama/{config.OLLAMA_MODEL}",  # Use the full model name format
+                base_url=config.OLLAMA_BASE_URL,
+                temperature=0.7,
+                timeout=config.LLM_TIMEOUT
+            )
+        self.llm = llm
+        if llm_cache is None and config.LLM_CACHE_ENABLED:
+            llm_cache = ApiCache(
+                path=config.LLM_CACHE_PATH,
+                ttls={'llm': config.LLM_CACHE_TTL},
+                max_bytes=config.LLM_CACHE_MAX_MB * 1024 * 1024
+            )
+        self.llm_cache = llm_cache
+        # crew_runner(agents, tasks) returns a stage's output; the default
+        # kicks off a CrewAI crew, a stub lets run_stage be checked offline
+        self.crew_runner = crew_runner or self._kickoff
+        self.summary = None
         
     def _analyze_sov_simple(self, videos):
         """Simple Share of Voice analysis"""
-        brands = [config.TARGET_BRAND] + config.COMPETITOR_BRANDS
-        total_mentions = {brand: 0 for brand in brands}
-        positive_mentions = {brand: 0 for brand in brands}
-        negative_mentions = {brand: 0 for brand in brands}
-        
-        total_comments = 0
-        
-        for video in videos:
-            comments = video.get('comments', [])
-            total_comments += len(comments)
-            
-            for comment in comments:
-                comment_text = comment.get('text', '').lower()
-                
-                # Check for brand mentions
-                for brand in brands:
-                    if brand in comment_text:
-                        total_mentions[brand] += 1
-                        
-                        # Simple sentiment analysis
-                        sentiment = self._simple_sentiment_analysis(comment_text)
-                        if sentiment == 'positive':
-                            positive_mentions[brand] += 1
-                        elif sentiment == 'negative':
-                            negative_mentions[brand] += 1
-        
-        # Calculate percentages
-        total_all_mentions = sum(total_mentions.values())
-        sov_percentages = {}
-        positive_sov = {}
-        
-        for brand in brands:
-            if total_all_mentions > 0:
-                sov_percentages[brand] = (total_mentions[brand] / total_all_mentions) * 100
-            else:
-                sov_percentages[brand] = 0
-                
-            total_positive = sum(positive_mentions.values())
-            if total_positive > 0:
-                positive_sov[brand] = (positive_mentions[brand] / total_positive) * 100
-            else:
-                positive_sov[brand] = 0
-        
-        return {
-            'total_mentions': total_mentions,
-            'positive_mentions': positive_mentions,
-            'negative_mentions': negative_mentions,
-            'sov_percentages': sov_percentages,
-            'positive_sov': positive_sov,
-            'total_comments': total_comments,
-            'videos_analyzed': len(videos)
-        }
+        return analyze_sov_simple(videos)
     
     def _simple_sentiment_analysis(self, text):
         """Simple sentiment analysis"""
-        text_lower = text.lower()
-        
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'love', 'best', 'perfect', 'awesome', 'fantastic', 'wonderful']
-        negative_words = ['bad', 'terrible', 'awful', 'worst', 'hate', 'disappointing', 'poor', 'horrible', 'useless', 'broken']
-        
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-        
-        if positive_count > negative_count:
-            return 'positive'
-        elif negative_count > positive_count:
-            return 'negative'
-        else:
-            return 'neutral'
+        return simple_sentiment_analysis(text)
         
     def create_agents(self):
-        """Create specialized agents with Ollama LLM"""
+        """Create the insights agent with Ollama LLM.
         
-        # Data Collection Agent
-        data_collector = Agent(
-            role='YouTube Data Collector',
-            goal='Collect comprehensive data from YouTube search results for smart fan videos',
-            backstory="""You are an expert data collector specializing in YouTube content analysis. 
-            Your job is to gather detailed information about videos, comments, and engagement metrics 
-            to provide a complete picture of the smart fan market on YouTube.""",
-            llm=self.llm,
-            verbose=True
-        )
-        
-        # Sentiment Analysis Agent
-        sentiment_analyzer = Agent(
-            role='Sentiment Analysis Expert',
-            goal='Analyze sentiment and Share of Voice metrics for Atomberg and competitors',
-            backstory="""You are a sentiment analysis expert with deep knowledge of brand perception 
-            and Share of Voice analysis. You understand how to interpret mentions, sentiment, and 
-            engagement to provide actionable insights for marketing teams.""",
-            llm=self.llm,
-            verbose=True
-        )
+        Data collection and SoV/sentiment analysis are computed
+        deterministically, so only the insight step needs an LLM.
+        """
+        from crewai import Agent
         
         # Insights and Recommendations Agent
         insights_agent = Agent(
@@ -132,51 +79,126 @@ class SoVAnalysisAgent:
             verbose=True
         )
         
-        return data_collector, sentiment_analyzer, insights_agent
+        return insights_agent
     
-    def create_tasks(self, data_collector, sentiment_analyzer, insights_agent):
-        """Create tasks for the agents"""
+    def create_brand_analyst(self):
+        """Create an agent that reviews one brand's SoV facts"""
+        from crewai import Agent
+        return Agent(
+            role='Brand Perception Analyst',
+            goal='Explain how YouTube viewers talk about a single fan brand',
+            backstory="""You are a consumer research analyst. You read Share of Voice figures and 
+            representative comments for one brand and summarize its strengths, weaknesses and 
+            recurring themes in a few concise bullet points.""",
+            llm=self.llm,
+            verbose=True
+        )
+    
+    def build_summary(self, videos):
+        """Compute SoV and sentiment numerically and condense them for the LLM"""
+        matcher = BrandMatcher()
+        comment_filter = None
+        if config.FILTER_COMMENTS:
+            # Filtered eagerly since the summary walks the videos a second time
+            comment_filter = CommentFilter(matcher)
+            videos = comment_filter.filter_list(videos)
+        results = analyze_sov_simple(videos, matcher)
+        if comment_filter:
+            results['filtered_comments'] = comment_filter.report()
+        summary = build_sov_summary(videos, results, matcher)
+        summary['search_query'] = config.SEARCH_QUERY
+        return summary
+    
+    def brand_prompt(self, brand, summary):
+        """Task description for one brand's analysis"""
+        facts = {
+            'brand': brand,
+            'target_brand': summary['target_brand'],
+            'facts': summary['brands'][brand],
+            'target_facts': summary['brands'][summary['target_brand']]
+        }
+        facts_json = json.dumps(facts, ensure_ascii=False, separators=(',', ':'))
         
-        # Task 1: Data Collection
-        data_collection_task = Task(
-            description="""Search YouTube for smart fan videos and collect comprehensive data including:
-            1. Video metadata (title, description, views, likes)
-            2. Comment data with sentiment analysis
-            3. Brand mention tracking for Atomberg and competitors
-            4. Engagement metrics analysis
+        return f"""Below are Share of Voice (SoV) facts and the most-liked YouTube comments
+            mentioning {brand}, with {summary['target_brand']}'s figures for comparison. Use only
+            these facts; do not invent data.
+            
+            {facts_json}
             
-            Use the collected data to understand the current market landscape.""",
-            agent=data_collector,
-            expected_output="Comprehensive dataset of YouTube videos and comments with brand mentions"
+            In at most five bullet points, describe how viewers perceive {brand}: its strengths,
+            weaknesses, and how it compares with {summary['target_brand']}."""
+    
+    def create_brand_task(self, brand_analyst, brand, summary):
+        """Create the analysis task for one brand"""
+        from crewai import Task
+        return Task(
+            description=self.brand_prompt(brand, summary),
+            agent=brand_analyst,
+            expected_output=f"Concise bullet-point perception analysis of {brand}"
         )
+    
+    def run_brand_stages(self, summary, max_workers=None):
+        """Run the per-brand analyses concurrently and return their notes by brand.
+        
+        Each stage sends its LLM requests one after another, so the thread
+        pool is what keeps at most max_workers (default LLM_CONCURRENCY)
+        requests in flight. Each brand is its own cached stage, so brands
+        whose facts did not change are not re-run.
+        """
+        if max_workers is None:
+            max_workers = config.LLM_CONCURRENCY
+        brands = [brand for brand, facts in summary['brands'].items() if facts['mentions'] > 0]
         
-        # Task 2: Sentiment Analysis
-        sentiment_analysis_task = Task(
-            description="""Analyze the collected data to determine:
-            1. Share of Voice percentages for all brands
-            2. Sentiment distribution (positive/negative/neutral)
-            3. Positive Share of Voice metrics
-            4. Competitive positioning analysis
+        def run_brand(brand):
+            brand_analyst = self.create_brand_analyst()
+            task = self.create_brand_task(brand_analyst, brand, summary)
+            return self.run_stage(f'brand:{brand}', [brand_analyst], [task], task.description)
+        
+        notes = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {brand: executor.submit(run_brand, brand) for brand in brands}
+            for brand, future in futures.items():
+                try:
+                    notes[brand] = clean_comment_text(future.result(), config.LLM_BRAND_NOTES_CHARS)
+                except Exception as e:
+                    print(f"⚠️  Analysis for {brand} failed: {e}")
+        return notes
+    
+    def insights_prompt(self, summary, brand_notes=None):
+        """Task description for the insights stage"""
+        summary_json = json.dumps(summary, ensure_ascii=False, separators=(',', ':'))
+        notes_section = ""
+        if brand_notes:
+            notes_json = json.dumps(brand_notes, ensure_ascii=False, separators=(',', ':'))
+            notes_section = f"""
             
-            Provide detailed insights about Atomberg's market position.""",
-            agent=sentiment_analyzer,
-            expected_output="Detailed Share of Voice and sentiment analysis report"
-        )
+            Per-brand analyst notes (JSON):
+            {notes_json}"""
         
-        # Task 3: Strategic Insights
-        insights_task = Task(
-            description="""Based on the analysis, generate strategic insights including:
-            1. Current market position assessment
+        return f"""The Share of Voice (SoV) facts below were computed from YouTube comments on
+            "{summary['search_query']}" videos. Use only these numbers; do not invent data.
+            
+            SoV facts (JSON):
+            {summary_json}{notes_section}
+            
+            Based on these facts, generate strategic insights including:
+            1. Current market position assessment for {summary['target_brand']}
             2. Competitive advantage identification
             3. Content strategy recommendations
             4. Actionable next steps for marketing team
             
-            Focus on practical recommendations that can be implemented immediately.""",
+            Focus on practical recommendations that can be implemented immediately."""
+    
+    def create_tasks(self, insights_agent, summary, brand_notes=None):
+        """Create the insights task around the precomputed SoV summary"""
+        from crewai import Task
+        insights_task = Task(
+            description=self.insights_prompt(summary, brand_notes),
             agent=insights_agent,
             expected_output="Strategic insights and actionable recommendations"
         )
         
-        return [data_collection_task, sentiment_analysis_task, insights_task]
+        return [insights_task]
     
     def run_analysis(self):
         """Run the complete CrewAI analysis"""
@@ -189,22 +211,25 @@ class SoVAnalysisAgent:
             videos = search_youtube_videos()
             print(f"✅ Collected data from {len(videos)} videos")
             
+            # Compute SoV and sentiment before involving the LLM
+            print("🧠 Computing Share of Voice...")
+            self.summary = self.build_summary(videos)
+            
+            # Optionally fan out per-brand analyses before the final stage
+            brand_notes = None
+            if config.LLM_PARALLEL_BRANDS:
+                print(f"🔀 Analyzing brands in parallel (up to {config.LLM_CONCURRENCY} at a time)...")
+                brand_notes = self.run_brand_stages(self.summary)
+            
             # Create agents
-            data_collector, sentiment_analyzer, insights_agent = self.create_agents()
+            insights_agent = self.create_agents()
             
             # Create tasks
-            tasks = self.create_tasks(data_collector, sentiment_analyzer, insights_agent)
-            
-            # Create crew
-            crew = Crew(
-                agents=[data_collector, sentiment_analyzer, insights_agent],
-                tasks=tasks,
-                verbose=True,
-                process=Process.sequential
-            )
+            tasks = self.create_tasks(insights_agent, self.summary, brand_notes)
             
             # Run the analysis
-            result = crew.kickoff()
+            result = self.run_stage('insights', [insights_agent], tasks,
+                                    {'summary': self.summary, 'brand_notes': brand_notes})
             
             return result
             
@@ -212,6 +237,77 @@ class SoVAnalysisAgent:
             print(f"❌ CrewAI analysis failed: {e}")
             return None
     
+    def _format_findings(self):
+        """Markdown table of the computed SoV figures"""
+        if not self.summary:
+            return "- No Share of Voice data available"
+        
+        lines = [
+            f"- Videos analyzed: {self.summary['videos_analyzed']}",
+            f"- Comments analyzed: {self.summary['total_comments']}",
+            f"- Brand mentions: {self.summary['total_mentions']}",
+            "",
+            "| Brand | Mentions | SoV | Positive SoV |",
+            "|-------|----------|-----|--------------|"
+        ]
+        for brand, facts in self.summary['brands'].items():
+            lines.append(
+                f"| {brand.title()} | {facts['mentions']} | {facts['sov_percent']:.1f}% "
+                f"| {facts['positive_sov_percent']:.1f}% |"
+            )
+        return "\n".join(lines)
+    
+    def _stage_key(self, stage, tasks, input_data):
+        """Cache key fields for one LLM stage"""
+        input_json = json.dumps(input_data, sort_keys=True, ensure_ascii=False)
+        return {
+            'stage': stage,
+            'model': getattr(self.llm, 'model', type(self.llm).__name__),
+            'temperature': getattr(self.llm, 'temperature', None),
+            'tasks': [task.description for task in tasks],
+            'input_hash': hashlib.sha256(input_json.encode('utf-8')).hexdigest()
+        }
+    
+    def run_stage(self, stage, agents, tasks, input_data):
+        """Run one crew stage, reusing the cached output if nothing changed"""
+        key = self._stage_key(stage, tasks, input_data)
+        
+        if self.llm_cache is not None and not config.FORCE_REFRESH:
+            cached = self.llm_cache.get('llm', key)
+            if cached is not None:
+                print(f"♻️  Reusing cached output for the {stage} stage")
+                count('llm_cache_hits')
+                return cached['output']
+        
+        with span(f'llm.{stage}'):
+            crew_output = self.crew_runner(agents, tasks)
+        self._count_tokens(crew_output)
+        output = str(crew_output)
+        
+        if self.llm_cache is not None:
+            self.llm_cache.set('llm', key, {'output': output})
+        return output
+    
+    @staticmethod
+    def _kickoff(agents, tasks):
+        """Run agents and tasks as a sequential CrewAI crew"""
+        from crewai import Crew, Process
+        crew = Crew(
+            agents=agents,
+            tasks=tasks,
+            verbose=True,
+            process=Process.sequential
+        )
+        return crew.kickoff()
+    
+    @staticmethod
+    def _count_tokens(crew_output):
+        """Add the token usage reported by a crew run to the run profile"""
+        usage = getattr(crew_output, 'token_usage', None)
+        count('llm_requests', getattr(usage, 'successful_requests', 0) or 0)
+        for field in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+            count(f'llm_{field}', getattr(usage, field, 0) or 0)
+    
     def generate_report(self, result):
         """Generate a comprehensive report from CrewAI results"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -226,7 +322,7 @@ class SoVAnalysisAgent:
 
 ## Executive Summary
 
-This analysis was conducted using CrewAI agents powered by Ollama for comprehensive Share of Voice analysis.
+Share of Voice and sentiment were computed directly from the collected comments; a CrewAI agent powered by Ollama turned those figures into strategic insights.
 
 ## AI Agent Analysis Results
 
@@ -234,9 +330,7 @@ This analysis was conducted using CrewAI agents powered by Ollama for comprehens
 
 ## Key Findings
 
-- Analysis completed using 3 specialized AI agents
-- Data collection, sentiment analysis, and strategic insights generated
-- Recommendations provided for marketing team
+{self._format_findings()}
 
 ## Next Steps
 
@@ -254,6 +348,7 @@ This analysis was conducted using CrewAI agents powered by Ollama for comprehens
 def main():
     """Main function to run CrewAI analysis"""
     agent = SoVAnalysisAgent()
+    get_profile().start_deep()
     result = agent.run_analysis()
     
     if result:
@@ -266,6 +361,7 @@ def main():
         print("\n" + "=" * 60)
         print("✅ CrewAI Analysis Complete!")
         print(f"📄 Report saved to: crewai_analysis_report.md")
+        print(f"⏱️  Run profile saved to: {write_profile('crewai_analysis_report.md')}")
         print("=" * 60)
         
         return result
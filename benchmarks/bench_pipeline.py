@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Throughput, latency and memory benchmark for the collection and SoV hot paths
+Runs sentiment scoring, brand matching, analyze_sov_simple and the scraper
+pipeline (against the offline replay client) over synthetic corpora, measures
+the memory held per collected comment, writes the numbers to JSON and fails
+on regressions against a baseline file
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import itertools
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from tools.brand_matcher import BrandMatcher
+from tools.rate_limiter import QuotaRateLimiter
+from tools.replay_client import ReplayYouTube, SyntheticCorpus, FILLER_WORDS, SENTIMENT_WORDS
+from tools.sov_analysis import simple_sentiment_analysis, analyze_sov_simple
+from tools.sov_parallel import analyze_sov_sharded
+from tools.sentiment import BACKENDS
+from tools.youtube_scraper import YouTubeScraper
+import config
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_BRAND_COUNTS = [6, 50, 500]
+COMMENTS_PER_VIDEO = 100
+# Per-item latencies are sampled from the first items of a run
+LATENCY_SAMPLE = 100_000
+# Short cases are repeated (best run wins) until this much time has been spent
+REPEAT_SECONDS = 2.0
+SYLLABLES = ['zan', 'tro', 'vel', 'kor', 'mix', 'bri', 'lum', 'dex', 'sol', 'qua']
+
+def brand_names(count):
+    """The configured brands padded with made-up, word-like brand names"""
+    real = [config.TARGET_BRAND] + config.COMPETITOR_BRANDS
+    made_up = (''.join(parts) for parts in itertools.product(SYLLABLES, repeat=3))
+    return (real + [name for name in made_up if name not in real])[:count]
+
+def text_pool(brands, size=5_000, seed=0):
+    """Comment texts with zero to two brand mentions and optional sentiment words"""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(size):
+        words = rng.sample(FILLER_WORDS, 4)
+        for _ in range(rng.choice([0, 1, 1, 2])):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(brands))
+        if rng.random() < 0.5:
+            words.append(rng.choice(SENTIMENT_WORDS))
+        pool.append(' '.join(words))
+    return pool
+
+def synthetic_videos(n_comments, pool):
+    """Lazily built videos with COMMENTS_PER_VIDEO comments each, cycling through pool"""
+    for video_index in range((n_comments + COMMENTS_PER_VIDEO - 1) // COMMENTS_PER_VIDEO):
+        first = video_index * COMMENTS_PER_VIDEO
+        yield {
+            'video_id': f"vid{video_index:08d}",
+            'view_count': 1000 + video_index,
+            'comments': [
+                {
+                    'comment_id': f"c{n}",
+                    'author': f"user{n % 5000}",
+                    'text': pool[n % len(pool)],
+                    'like_count': n % 7,
+                    'published_at': f"2024-01-{1 + n % 28:02d}T00:00:00Z"
+                }
+                for n in range(first, min(n_comments, first + COMMENTS_PER_VIDEO))
+            ]
+        }
+
+def percentiles(latencies):
+    """p50/p95/p99 of latencies in seconds, reported in milliseconds"""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99)}
+
+def per_item(function, items, n):
+    """Run function over n items; returns (throughput seconds, sampled latencies)"""
+    latencies = []
+    clock = time.perf_counter
+    for i in range(min(n, LATENCY_SAMPLE)):
+        start = clock()
+        function(items[i % len(items)])
+        latencies.append(clock() - start)
+    
+    start = clock()
+    for i in range(n):
+        function(items[i % len(items)])
+    return clock() - start, latencies
+
+def per_video(consume, videos):
+    """Run consume over a video stream, timing the gap between videos"""
+    latencies = []
+    clock = time.perf_counter
+    
+    def timed(videos):
+        last = clock()
+        for video in videos:
+            yield video
+            now = clock()
+            latencies.append(now - last)
+            last = now
+    
+    start = clock()
+    consume(timed(videos))
+    return clock() - start, latencies
+
+def bench_sentiment(n, brands):
+    pool = text_pool(brands)
+    return per_item(simple_sentiment_analysis, pool, n)
+
+def bench_backend(name):
+    """Uncached cost of a sentiment backend, called in SENTIMENT_BATCH_SIZE batches"""
+    def run(n, brands):
+        backend = BACKENDS[name](cache_size=0)
+        pool = text_pool(brands)
+        size = config.SENTIMENT_BATCH_SIZE
+        batches = [[pool[(start + i) % len(pool)] for i in range(size)] for start in range(0, len(pool), size)]
+        seconds, latencies = per_item(backend.score_batch, batches, max(1, n // size))
+        return seconds * n / (max(1, n // size) * size), latencies
+    return run
+
+def bench_matching(n, brands):
+    pool = text_pool(brands)
+    matcher = BrandMatcher(brands, {})
+    return per_item(matcher.find_brands, pool, n)
+
+def bench_analyze(n, brands):
+    pool = text_pool(brands)
+    matcher = BrandMatcher(brands, {})
+    return per_video(lambda videos: analyze_sov_simple(videos, matcher), synthetic_videos(n, pool))
+
+def bench_sharded(n, brands):
+    pool = text_pool(brands)
+    matcher = BrandMatcher(brands, {})
+    # One worker per CPU core, so results show how the sharded engine scales on this machine
+    return per_video(lambda videos: analyze_sov_sharded(videos, matcher, processes=os.cpu_count()),
+                     synthetic_videos(n, pool))
+
+def replay_stream(n, brands):
+    """Scraper stream of about n comments served by the offline replay client"""
+    videos = max(1, n // COMMENTS_PER_VIDEO)
+    client = ReplayYouTube(SyntheticCorpus(videos=videos, comments=n, brands=brands),
+                           latency=0, error_rate=0)
+    scraper = YouTubeScraper(client=client, rate_limiter=QuotaRateLimiter(10 ** 12, 10 ** 9, path=''))
+    return scraper.stream_videos(max_results=videos, comments_per_video=0, max_total_comments=0)
+
+def bench_scraper(n, brands):
+    matcher = BrandMatcher(brands, {})
+    return per_video(lambda videos: analyze_sov_simple(videos, matcher), replay_stream(n, brands))
+
+def collect_videos(n, brands):
+    """Videos with every comment held in memory, as search_videos returns them"""
+    return [dict(video, comments=list(video['comments'])) for video in replay_stream(n, brands)]
+
+def bench_collect(n, brands):
+    return per_video(lambda videos: [list(video['comments']) for video in videos], replay_stream(n, brands))
+
+# name -> (function, latency unit, varies with brand count)
+BENCHMARKS = {
+    'simple_sentiment_analysis': (bench_sentiment, 'comment', False),
+    'sentiment_lexicon': (bench_backend('lexicon'), 'batch', False),
+    'sentiment_rules': (bench_backend('rules'), 'batch', False),
+    'sentiment_transformer': (bench_backend('transformer'), 'batch', False),
+    'brand_matching': (bench_matching, 'comment', True),
+    'analyze_sov_simple': (bench_analyze, 'video', True),
+    'analyze_sov_sharded': (bench_sharded, 'video', True),
+    'scraper_pipeline': (bench_scraper, 'video', False),
+    'collect_comments': (bench_collect, 'video', False),
+}
+
+# Benchmarks that also report the memory their records hold on to: name -> function returning them
+RETAINED = {
+    'collect_comments': collect_videos,
+}
+
+def best_of(function, n, brands, repeat):
+    """Fastest of up to repeat runs, stopping early once REPEAT_SECONDS have passed"""
+    best = None
+    spent = 0.0
+    for _ in range(max(1, repeat)):
+        seconds, latencies = function(n, brands)
+        spent += seconds
+        if best is None or seconds < best[0]:
+            best = (seconds, latencies)
+        if spent >= REPEAT_SECONDS:
+            break
+    return best
+
+# The transformer backend needs optional packages and runs far slower than the rest
+DEFAULT_BENCHMARKS = [name for name in BENCHMARKS if name != 'sentiment_transformer']
+
+def peak_memory_mb(function, n, brands):
+    """Peak traced allocation of one extra run, in MiB"""
+    tracemalloc.start()
+    try:
+        function(n, brands)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+def bytes_per_comment(collect, n, brands):
+    """Traced memory still held once n comments and their videos are collected, per comment"""
+    tracemalloc.start()
+    try:
+        records = collect(n, brands)
+        return tracemalloc.get_traced_memory()[0] / n
+    finally:
+        tracemalloc.stop()
+
+def run_cases(selected, sizes, brand_counts, repeat, measure_memory):
+    cases = {}
+    for name in selected:
+        function, unit, by_brands = BENCHMARKS[name]
+        for n in sizes:
+            # Benchmarks that don't depend on the brand list run with the configured brands
+            for brand_count in (brand_counts if by_brands else [1 + len(config.COMPETITOR_BRANDS)]):
+                brands = brand_names(brand_count)
+                key = f"{name}/{n}c/{brand_count}b"
+                seconds, latencies = best_of(function, n, brands, repeat)
+                case = {
+                    'comments': n,
+                    'brands': brand_count,
+                    'seconds': seconds,
+                    'comments_per_s': n / seconds if seconds else None,
+                    'ms_per_1k_comments': seconds / n * 1e6 if n else None,
+                    'latency_unit': unit,
+                    'latency_ms': percentiles(latencies)
+                }
+                if measure_memory:
+                    case['peak_memory_mb'] = peak_memory_mb(function, n, brands)
+                    if name in RETAINED:
+                        case['memory_per_comment_bytes'] = bytes_per_comment(RETAINED[name], n, brands)
+                cases[key] = case
+                
+                memory = f"  peak {case['peak_memory_mb']:7.1f} MiB" if measure_memory else ""
+                if 'memory_per_comment_bytes' in case:
+                    memory += f"  {case['memory_per_comment_bytes']:6.0f} B/comment"
+                print(f"{key:<44} {case['comments_per_s']:>12,.0f} comments/s  "
+                      f"p95 {case['latency_ms'].get('p95', 0):8.3f} ms/{unit}{memory}")
+    return cases
+
+def find_regressions(cases, baseline, threshold):
+    """Cases slower, or using more memory, than baseline by more than threshold"""
+    regressions = []
+    for key, case in cases.items():
+        before = baseline.get('cases', {}).get(key)
+        if not before:
+            continue
+        if before.get('comments_per_s') and case['comments_per_s'] < before['comments_per_s'] / (1 + threshold):
+            regressions.append(f"{key}: {case['comments_per_s']:,.0f} comments/s "
+                               f"(baseline {before['comments_per_s']:,.0f})")
+        if before.get('peak_memory_mb') and case.get('peak_memory_mb', 0) > before['peak_memory_mb'] * (1 + threshold):
+            regressions.append(f"{key}: peak {case['peak_memory_mb']:.1f} MiB "
+                               f"(baseline {before['peak_memory_mb']:.1f})")
+        if (before.get('memory_per_comment_bytes')
+                and case.get('memory_per_comment_bytes', 0) > before['memory_per_comment_bytes'] * (1 + threshold)):
+            regressions.append(f"{key}: {case['memory_per_comment_bytes']:.0f} B/comment "
+                               f"(baseline {before['memory_per_comment_bytes']:.0f})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the collection and SoV analysis hot paths")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=DEFAULT_BENCHMARKS,
+                        help="Benchmarks to run (default: all but sentiment_transformer)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES,
+                        help="Corpus sizes in comments (default: 1000 100000 1000000)")
+    parser.add_argument("--brands", nargs="+", type=int, default=DEFAULT_BRAND_COUNTS,
+                        help="Tracked brand counts (default: 6 50 500)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs of each short case, best one kept (default: 5)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the extra tracemalloc run that measures peak memory")
+    parser.add_argument("--output", default=str(project_root / "benchmarks" / "results" / "pipeline.json"),
+                        help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results previously written with --output")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown or memory growth vs the baseline (default: 0.2 = 20%%)")
+    args = parser.parse_args()
+    
+    cases = run_cases(args.benchmarks, args.sizes, args.brands, args.repeat, not args.no_memory)
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': cases
+    }
+    
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {output}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(cases, baseline, args.threshold)
+        if regressions:
+            print(f"❌ Regressed by more than {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  • {regression}")
+            return 1
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
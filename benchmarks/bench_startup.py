@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Start-up time benchmark for the quick analysis path
+Measures fresh interpreter runs of the entry points and fails if the
+median exceeds the threshold
+"""
+
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+# Each case is a fresh interpreter, so imports are measured cold
+CASES = {
+    'main --help': [sys.executable, 'main.py', '--help'],
+    'import quick_analysis': [sys.executable, '-c', 'import quick_analysis'],
+    'import youtube_scraper': [sys.executable, '-c', 'import tools.youtube_scraper'],
+    'python baseline': [sys.executable, '-c', 'pass'],
+}
+
+def time_command(command, runs):
+    """Wall time in seconds of each run of command"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=project_root, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark start-up time of the quick path")
+    parser.add_argument("--runs", type=int, default=7, help="Runs per case (default: 7)")
+    parser.add_argument("--threshold", type=float, default=1.0,
+                        help="Fail if a case's median exceeds this many seconds (default: 1.0)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    
+    results = {}
+    for name, command in CASES.items():
+        timings = time_command(command, args.runs)
+        results[name] = {
+            'median_s': statistics.median(timings),
+            'min_s': min(timings),
+            'max_s': max(timings)
+        }
+        print(f"{name:<24} median {results[name]['median_s'] * 1000:7.1f} ms  "
+              f"(min {results[name]['min_s'] * 1000:.1f}, max {results[name]['max_s'] * 1000:.1f})")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    
+    slow = [name for name, result in results.items() if result['median_s'] > args.threshold]
+    if slow:
+        print(f"❌ Slower than {args.threshold:.2f}s: {', '.join(slow)}")
+        return 1
+    print(f"✅ All cases start in under {args.threshold:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
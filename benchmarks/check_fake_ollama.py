@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Per-brand LLM fan-out check against a local fake Ollama server
+Starts a fake endpoint that answers like Ollama after a delay, runs the
+brand stages against it and fails unless every brand gets notes and no
+more than the configured number of requests were in flight at once
+"""
+
+import sys
+import json
+import time
+import argparse
+import importlib.util
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from agents.sov_agent import SoVAnalysisAgent
+from tools.http_session import get_session
+import config
+
+class FakeOllama:
+    """Ollama-compatible endpoint answering every prompt with a final answer.
+
+    Serves /api/tags, /api/version, /api/show, /api/generate and /api/chat
+    (streamed or not), and records how many generate/chat requests were
+    in flight at once.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, delay: float = 0.2):
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def answer(self, body: dict) -> dict:
+        """Ollama response fields for one generate or chat request"""
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        
+        text = f"Thought: I now know the final answer\nFinal Answer: Fake analysis #{number}"
+        return {
+            'model': body.get('model', ''),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'done': True,
+            'done_reason': 'stop',
+            'prompt_eval_count': len(json.dumps(body)) // 4,
+            'eval_count': len(text) // 4,
+            'text': text
+        }
+    
+    def _handler(self):
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/api/tags'):
+                    self._send({'models': [{'name': config.OLLAMA_MODEL, 'model': config.OLLAMA_MODEL}]})
+                elif self.path.startswith('/api/version'):
+                    self._send({'version': '0.0.0-fake'})
+                else:
+                    self.send_error(404)
+            
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if self.path.startswith('/api/show'):
+                    self._send({'modelfile': '', 'parameters': '', 'template': '{{ .Prompt }}',
+                                'details': {}, 'model_info': {}})
+                    return
+                if not self.path.startswith(('/api/generate', '/api/chat')):
+                    self.send_error(404)
+                    return
+                
+                reply = fake.answer(body)
+                text = reply.pop('text')
+                if self.path.startswith('/api/chat'):
+                    reply['message'] = {'role': 'assistant', 'content': text}
+                else:
+                    reply['response'] = text
+                # Ollama streams by default; the whole answer then comes as one final chunk
+                self._send(reply, ndjson=body.get('stream', True))
+            
+            def _send(self, payload, ndjson=False):
+                data = (json.dumps(payload) + ('\n' if ndjson else '')).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson' if ndjson else 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+
+class PlainBrandAgent(SoVAnalysisAgent):
+    """Brand stages without CrewAI: each task's prompt goes straight to /api/generate"""
+
+    def create_brand_analyst(self):
+        return None
+    
+    def create_brand_task(self, brand_analyst, brand, summary):
+        return SimpleNamespace(description=self.brand_prompt(brand, summary))
+    
+    @staticmethod
+    def _kickoff(agents, tasks):
+        output = None
+        for task in tasks:
+            response = get_session(retries=False).post(
+                f"{config.OLLAMA_BASE_URL}/api/generate",
+                json={'model': config.OLLAMA_MODEL, 'prompt': task.description, 'stream': False},
+                timeout=config.LLM_TIMEOUT
+            )
+            response.raise_for_status()
+            output = response.json()['response']
+        return output
+
+def sample_summary(agent):
+    """SoV summary of one video mentioning every configured brand"""
+    brands = [config.TARGET_BRAND] + config.COMPETITOR_BRANDS
+    # Distinct texts, so the duplicate filter keeps every one
+    comments = [
+        {'comment_id': f'c{n}', 'author': f'a{n}', 'text': f'{brand} review number {n}: ' + 'ok ' * n,
+         'like_count': n, 'published_at': '2025-01-01T00:00:00Z'}
+        for n, brand in enumerate(brands)
+    ]
+    return agent.build_summary([{'video_id': 'vid1', 'title': 'Fan review', 'view_count': 1000,
+                                 'comments': comments}])
+
+def run_check(workers: int, delay: float) -> int:
+    fake = FakeOllama(delay=delay).start()
+    config.OLLAMA_BASE_URL = fake.base_url
+    config.LLM_CACHE_ENABLED = False
+    failures = []
+    try:
+        from main import check_ollama_available
+        if not check_ollama_available():
+            failures.append(f"check_ollama_available() did not detect the fake server at {fake.base_url}")
+        
+        if importlib.util.find_spec('crewai') is not None:
+            print(f"🤖 Running CrewAI brand stages against {fake.base_url}")
+            agent = SoVAnalysisAgent()
+        else:
+            print(f"⚠️  CrewAI not installed: brand prompts go straight to {fake.base_url}/api/generate")
+            agent = PlainBrandAgent(llm=SimpleNamespace(model=config.OLLAMA_MODEL, temperature=0.7))
+        
+        summary = sample_summary(agent)
+        brands = [brand for brand, facts in summary['brands'].items() if facts['mentions'] > 0]
+        start = time.perf_counter()
+        notes = agent.run_brand_stages(summary, max_workers=workers)
+        elapsed = time.perf_counter() - start
+    finally:
+        fake.stop()
+    
+    print(f"brands: {len(brands)}  requests: {fake.requests}  max in flight: {fake.max_in_flight}  "
+          f"elapsed: {elapsed:.2f}s")
+    missing = [brand for brand in brands if 'Fake analysis' not in notes.get(brand, '')]
+    if missing:
+        failures.append(f"no notes from the fake server for {', '.join(missing)}")
+    if fake.max_in_flight > workers:
+        failures.append(f"{fake.max_in_flight} requests were in flight at once, over the cap of {workers}")
+    if workers > 1 and len(brands) > 1 and fake.max_in_flight < 2:
+        failures.append("the brand stages never overlapped")
+    
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print(f"✅ All brands analyzed with at most {workers} requests in flight")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the per-brand LLM fan-out against a fake Ollama server")
+    parser.add_argument("--workers", type=int, default=config.LLM_CONCURRENCY,
+                        help="Brand stages in flight at once (default: LLM_CONCURRENCY)")
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds the fake server takes per answer")
+    parser.add_argument("--serve", action="store_true",
+                        help="Only run the fake server, e.g. for OLLAMA_BASE_URL=http://127.0.0.1:11435")
+    parser.add_argument("--port", type=int, default=11435, help="Port for --serve (default: 11435)")
+    args = parser.parse_args()
+    
+    if args.serve:
+        fake = FakeOllama(port=args.port, delay=args.delay)
+        print(f"🧪 Fake Ollama listening on {fake.base_url}")
+        try:
+            fake.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            fake.server.server_close()
+        return 0
+    return run_check(args.workers, args.delay)
+
+if __name__ == "__main__":
+    sys.exit(main())
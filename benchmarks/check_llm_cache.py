@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+LLM stage cache check with a stub crew runner
+Runs the insights stage through SoVAnalysisAgent.run_stage with a temporary
+cache, and fails unless a repeat run is a cache hit and a changed input is
+a miss; needs neither CrewAI nor Ollama
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from agents.sov_agent import SoVAnalysisAgent
+from tools.api_cache import ApiCache
+from tools.profiling import get_profile
+import config
+
+class StubCrew:
+    """Crew runner that answers every stage with a numbered insight and counts the runs"""
+
+    def __init__(self):
+        self.calls = 0
+    
+    def __call__(self, agents, tasks):
+        self.calls += 1
+        return f"Stub insight #{self.calls}"
+
+def sample_videos(extra_comment: str = None):
+    """Two-comment video, plus extra_comment to change the stage input"""
+    comments = [
+        {'comment_id': 'c1', 'author': 'a', 'text': 'Atomberg is silent and great', 'like_count': 3,
+         'published_at': '2025-01-01T00:00:00Z'},
+        {'comment_id': 'c2', 'author': 'b', 'text': 'Crompton fan is noisy', 'like_count': 1,
+         'published_at': '2025-01-02T00:00:00Z'},
+    ]
+    if extra_comment:
+        comments.append({'comment_id': 'c3', 'author': 'c', 'text': extra_comment, 'like_count': 0,
+                         'published_at': '2025-01-03T00:00:00Z'})
+    return [{'video_id': 'vid1', 'title': 'Fan review', 'view_count': 1000, 'comments': comments}]
+
+def run_insights(agent, videos):
+    """Run the insights stage for videos; returns (output, crew runs it made)"""
+    summary = agent.build_summary(videos)
+    # Only a task's description goes into the cache key, so no CrewAI Task is needed
+    tasks = [SimpleNamespace(description=agent.insights_prompt(summary))]
+    calls = agent.crew_runner.calls
+    output = agent.run_stage('insights', [], tasks, {'summary': summary, 'brand_notes': None})
+    return output, agent.crew_runner.calls - calls
+
+def main():
+    config.FORCE_REFRESH = False
+    failures = []
+    
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ApiCache(path=str(Path(directory) / 'llm.sqlite'), ttls={'llm': 3600})
+        agent = SoVAnalysisAgent(llm=SimpleNamespace(model='stub', temperature=0.0),
+                                 llm_cache=cache, crew_runner=StubCrew())
+        
+        first, first_calls = run_insights(agent, sample_videos())
+        print(f"first run:     {first_calls} crew runs")
+        if first_calls != 1:
+            failures.append("the first run did not run the crew (expected a cache miss)")
+        
+        hits = get_profile().counters.get('llm_cache_hits', 0)
+        repeat, repeat_calls = run_insights(agent, sample_videos())
+        print(f"repeat run:    {repeat_calls} crew runs")
+        if repeat_calls or repeat != first or get_profile().counters.get('llm_cache_hits', 0) != hits + 1:
+            failures.append("the repeat run was not served from the cache")
+        
+        changed, changed_calls = run_insights(agent, sample_videos("Havells fan is great too"))
+        print(f"changed input: {changed_calls} crew runs")
+        if changed_calls != 1 or changed == first:
+            failures.append("a changed input hash reused the cached output")
+        
+        config.FORCE_REFRESH = True
+        _, forced_calls = run_insights(agent, sample_videos())
+        config.FORCE_REFRESH = False
+        print(f"force refresh: {forced_calls} crew runs")
+        if forced_calls != 1:
+            failures.append("FORCE_REFRESH reused the cached output")
+    
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Cache miss, hit and invalidation behave as expected")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,12 +7,106 @@ load_dotenv()
 # YouTube API Configuration
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY", "YOUR_YOUTUBE_API_KEY_HERE")
 
+# Offline Replay Configuration (serve API responses without network access)
+YOUTUBE_REPLAY = os.getenv("YOUTUBE_REPLAY", "")  # "", "synthetic" or path to a recorded CACHE_PATH database
+REPLAY_VIDEOS = int(os.getenv("REPLAY_VIDEOS", "200"))  # Size of the synthetic corpus
+REPLAY_COMMENTS = int(os.getenv("REPLAY_COMMENTS", "20000"))
+REPLAY_LATENCY_MS = float(os.getenv("REPLAY_LATENCY_MS", "0"))  # Delay added to every replayed request
+REPLAY_ERROR_RATE = float(os.getenv("REPLAY_ERROR_RATE", "0"))  # Fraction of requests failing with a retryable error
+REPLAY_SEED = int(os.getenv("REPLAY_SEED", "0"))
+
 # Ollama Configuration (for CrewAI)
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma3:1b")
+# Size of the SoV summary given to the LLM
+LLM_TOP_COMMENTS = int(os.getenv("LLM_TOP_COMMENTS", "3"))  # Most-liked comments per brand (0 = none)
+LLM_COMMENT_CHARS = int(os.getenv("LLM_COMMENT_CHARS", "200"))  # Characters kept per comment
+# Per-brand LLM analyses run concurrently before the final insights stage
+LLM_PARALLEL_BRANDS = os.getenv("LLM_PARALLEL_BRANDS", "false").lower() == "true"
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "2"))  # Brand analyses in flight at once
+LLM_BRAND_NOTES_CHARS = int(os.getenv("LLM_BRAND_NOTES_CHARS", "800"))  # Kept per brand for the final stage
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "600"))  # Seconds per LLM request (passed to CrewAI's LLM) on slow CPU-only hosts
 
 # Analysis Configuration
 SEARCH_QUERY = os.getenv("SEARCH_QUERY", "smart fan")
+# Queries covered by one batch run, comma-separated
+SEARCH_QUERIES = [q.strip() for q in os.getenv("SEARCH_QUERIES", SEARCH_QUERY).split(",") if q.strip()]
 TOP_N_RESULTS = int(os.getenv("TOP_N_RESULTS", "50"))
 TARGET_BRAND = os.getenv("TARGET_BRAND", "atomberg")
 COMPETITOR_BRANDS = os.getenv("COMPETITOR_BRANDS", "crompton,havells,orient,usha,bajaj").split(",")
+# Time bucket for SoV trends: "day" or "week"
+SOV_TIME_BUCKET = os.getenv("SOV_TIME_BUCKET", "day")
+# Worker processes for sharded analysis (1 = single process, 0 = one per CPU core)
+ANALYSIS_PROCESSES = int(os.getenv("ANALYSIS_PROCESSES", "1"))
+ANALYSIS_CHUNK_SIZE = int(os.getenv("ANALYSIS_CHUNK_SIZE", "5000"))  # Comments per worker task
+# Sentiment backend: "lexicon" (word lists), "rules" (VADER-style, handles negation) or "transformer"
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "lexicon")
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "256"))  # Comments scored per backend call
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "100000"))  # Scores cached per normalized text (rules and transformer)
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "distilbert-base-uncased-finetuned-sst-2-english")
+SENTIMENT_MIN_CONFIDENCE = float(os.getenv("SENTIMENT_MIN_CONFIDENCE", "0.6"))  # Below this, transformer says neutral
+# Drop duplicate, near-duplicate and spam comments before analysis
+FILTER_COMMENTS = os.getenv("FILTER_COMMENTS", "true").lower() == "true"
+FILTER_NEAR_DUPLICATES = os.getenv("FILTER_NEAR_DUPLICATES", "true").lower() == "true"  # MinHash/LSH copy-paste detection
+FILTER_AUTHOR_LIMIT = int(os.getenv("FILTER_AUTHOR_LIMIT", "20"))  # Further comments by one author count as spam (0 = no limit)
+# Alternate spellings counted as mentions of a brand, as "brand:alias|alias,brand:alias"
+BRAND_ALIASES = {
+    brand.strip(): [alias.strip() for alias in aliases.split("|") if alias.strip()]
+    for brand, _, aliases in (
+        entry.partition(":") for entry in os.getenv(
+            "BRAND_ALIASES", "atomberg:atom berg|atomburg,havells:havels|havell"
+        ).split(",") if entry.strip()
+    )
+}
+
+# Collection Configuration
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "8"))
+DAILY_QUOTA_UNITS = int(os.getenv("DAILY_QUOTA_UNITS", "10000"))
+API_REQUESTS_PER_SECOND = float(os.getenv("API_REQUESTS_PER_SECOND", "10"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "5"))  # Retries for 429/5xx/rate-limit errors
+API_BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", "1"))  # Seconds, doubled per retry with full jitter
+API_BACKOFF_MAX = float(os.getenv("API_BACKOFF_MAX", "60"))  # Longest single backoff in seconds
+COMMENTS_PER_VIDEO = int(os.getenv("COMMENTS_PER_VIDEO", "100"))  # 0 = no limit
+MAX_TOTAL_COMMENTS = int(os.getenv("MAX_TOTAL_COMMENTS", "0"))  # 0 = no limit
+INCLUDE_REPLIES = os.getenv("INCLUDE_REPLIES", "false").lower() == "true"
+KEEP_VIDEO_DETAILS = os.getenv("KEEP_VIDEO_DETAILS", "false").lower() == "true"  # Keep video descriptions and thumbnails
+INCREMENTAL = os.getenv("INCREMENTAL", "false").lower() == "true"
+STATE_PATH = os.getenv("STATE_PATH", ".cache/crawl_state.json")
+ARCHIVE_RAW = os.getenv("ARCHIVE_RAW", "false").lower() == "true"  # Keep raw videos and comments on disk
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+
+# Service Configuration (long-running SoV daemon started with main.py --serve)
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8765"))
+SERVICE_WINDOW_HOURS = float(os.getenv("SERVICE_WINDOW_HOURS", "168"))  # Sliding window over comment publish times
+SERVICE_REFRESH_MINUTES = float(os.getenv("SERVICE_REFRESH_MINUTES", "60"))
+
+# Cache Configuration
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_PATH = os.getenv("CACHE_PATH", ".cache/youtube_api.sqlite")
+# Daily quota units used, shared by every run against the same database ("" = per process only)
+QUOTA_PATH = os.getenv("QUOTA_PATH", CACHE_PATH)
+CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "200"))
+FORCE_REFRESH = os.getenv("FORCE_REFRESH", "false").lower() == "true"
+# Seconds each endpoint's responses stay fresh (0 disables caching for it)
+CACHE_TTLS = {
+    'search': int(os.getenv("CACHE_TTL_SEARCH", "21600")),
+    'videos': int(os.getenv("CACHE_TTL_VIDEOS", "3600")),
+    'commentThreads': int(os.getenv("CACHE_TTL_COMMENTS", "3600")),
+    'comments': int(os.getenv("CACHE_TTL_COMMENTS", "3600")),
+}
+
+# LLM output cache, reused when model, prompt and input data are unchanged
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_outputs.sqlite")
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "50"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "604800"))
+
+# HTTP Configuration (shared connection pool for all outbound calls)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # Keep-alive connections per host
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))  # Seconds per request
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))  # urllib3 retries for get_session() callers (not the YouTube client)
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))  # Exponential backoff factor in seconds
+
+# Profiling Configuration (a <results>_profile.json is always written next to the results)
+PROFILE_MODE = os.getenv("PROFILE_MODE", "")  # "", "cprofile" or "tracemalloc" for a deep dive
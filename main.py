@@ -6,22 +6,39 @@ Clean, working version with both simple and CrewAI analysis
 
 import sys
 import os
+import argparse
+import importlib.util
 from pathlib import Path
 
 # Add the project root to the Python path
 project_root = Path(__file__).parent
 sys.path.append(str(project_root))
 
-from quick_analysis import main as run_simple_analysis
 import config
 
+# The analysis modules (and googleapiclient/crewai behind them) are imported
+# only once a branch needs them, so --help and quick runs start fast
+
+def run_simple_analysis():
+    from quick_analysis import main as run_quick
+    return run_quick()
+
+def run_batch_analysis(queries):
+    from quick_analysis import run_batch_analysis as run_batch
+    return run_batch(queries)
+
+def run_service():
+    from tools.sov_service import serve
+    return serve()
+
 def check_ollama_available():
     """Check if Ollama is available and running"""
     try:
-        import requests
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        from tools.http_session import get_session
+        # No retries: when Ollama is down, fall back to the simple analysis at once
+        response = get_session(retries=False).get(f"{config.OLLAMA_BASE_URL}/api/tags", timeout=5)
         return response.status_code == 200
-    except:
+    except Exception:
         return False
 
 def run_crewai_analysis():
@@ -37,8 +54,31 @@ def run_crewai_analysis():
         print(f"❌ CrewAI analysis failed: {e}")
         return None
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Atomberg Share of Voice Analysis")
+    parser.add_argument(
+        "--queries", nargs="+", metavar="QUERY",
+        help="Run a batch analysis over several search queries (default: SEARCH_QUERIES)"
+    )
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="Run the long-lived SoV service with an HTTP API instead of a one-shot analysis"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main application entry point"""
+    args = parse_args(argv)
+    if args.serve:
+        run_service()
+        return
+    
+    # Explicit --queries, even a single one, and several configured queries
+    # run as one batch with a shared quota budget
+    if args.queries or len(config.SEARCH_QUERIES) > 1:
+        run_batch_analysis(args.queries or config.SEARCH_QUERIES)
+        return
+    
     print("🎯 Atomberg Share of Voice Analysis")
     print("=" * 50)
     print(f"Search Query: {config.SEARCH_QUERY}")
@@ -47,9 +87,8 @@ def main():
     print(f"Top N Results: {config.TOP_N_RESULTS}")
     print("=" * 50)
     
-    # Check if CrewAI and Ollama are available
-    try:
-        import crewai
+    # Check if CrewAI and Ollama are available without importing CrewAI
+    if importlib.util.find_spec("crewai") is not None:
         print("\n🤖 CrewAI detected...")
         
         # Check if Ollama is running
@@ -73,7 +112,7 @@ def main():
             print("   3. Run this script again")
             run_simple_analysis()
         
-    except ImportError:
+    else:
         print("\n⚠️  CrewAI not available - Running simple analysis...")
         print("   Install CrewAI with: pip install crewai langchain langchain-community")
         run_simple_analysis()
@@ -14,143 +14,195 @@ import json
 project_root = Path(__file__).parent
 sys.path.append(str(project_root))
 
-from tools.youtube_scraper import search_youtube_videos
+from tools.youtube_scraper import YouTubeScraper, search_youtube_videos, stream_new_youtube_comments
+from tools.brand_matcher import BrandMatcher
+from tools.crawl_state import CrawlState
+from tools.raw_archive import RawArchive
+from tools.comment_filter import CommentFilter
+from tools.profiling import get_profile, write_profile
+from tools.sov_analysis import simple_sentiment_analysis, analyze_sov_simple, analyze_sov_incremental
+from tools.sov_parallel import analyze_sov_sharded
 import config
 
-def simple_sentiment_analysis(text):
-    """Simple sentiment analysis without heavy dependencies"""
-    text_lower = text.lower()
+def display_results(results):
+    """Print SoV results, summary and key insights"""
+    print("\n📊 Share of Voice Results:")
+    print("-" * 40)
     
-    # Simple positive/negative word lists
-    positive_words = ['good', 'great', 'excellent', 'amazing', 'love', 'best', 'perfect', 'awesome', 'fantastic', 'wonderful']
-    negative_words = ['bad', 'terrible', 'awful', 'worst', 'hate', 'disappointing', 'poor', 'horrible', 'useless', 'broken']
+    for brand in [config.TARGET_BRAND] + config.COMPETITOR_BRANDS:
+        mentions = results['total_mentions'][brand]
+        sov = results['sov_percentages'][brand]
+        positive_sov = results['positive_sov'][brand]
+        
+        print(f"• {brand.title()}: {sov:.1f}% ({mentions} mentions)")
+        print(f"  - Positive SoV: {positive_sov:.1f}%")
+        if 'like_weighted_sov' in results:
+            print(f"  - Like-weighted SoV: {results['like_weighted_sov'][brand]:.1f}%")
+            print(f"  - View-weighted SoV: {results['view_weighted_sov'][brand]:.1f}%")
     
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
+    print(f"\n📈 Summary:")
+    print(f"• Total videos analyzed: {results['videos_analyzed']}")
+    print(f"• Total comments analyzed: {results['total_comments']}")
+    print(f"• Total brand mentions: {sum(results['total_mentions'].values())}")
+    if 'filtered_comments' in results:
+        removed = results['filtered_comments']['removed']
+        print(f"• Comments filtered out: {results['filtered_comments']['removed_total']} "
+              f"({removed.get('duplicate', 0)} duplicates, {removed.get('near_duplicate', 0)} near-duplicates, "
+              f"{removed.get('spam', 0)} spam)")
+    if results.get('unfinished_videos'):
+        print(f"⚠️  {len(results['unfinished_videos'])} videos could not be fully fetched "
+              f"(listed under 'unfinished_videos' in the results file)")
     
-    if positive_count > negative_count:
-        return 'positive'
-    elif negative_count > positive_count:
-        return 'negative'
-    else:
-        return 'neutral'
+    # Generate insights
+    atomberg_sov = results['sov_percentages'][config.TARGET_BRAND]
+    competitors = {k: v for k, v in results['sov_percentages'].items() if k != config.TARGET_BRAND}
+    top_competitor = max(competitors, key=competitors.get) if competitors else None
+    
+    print(f"\n💡 Key Insights:")
+    print(f"• {config.TARGET_BRAND.title()} has {atomberg_sov:.1f}% Share of Voice")
+    if top_competitor:
+        competitor_sov = results['sov_percentages'][top_competitor]
+        print(f"• Top competitor: {top_competitor.title()} ({competitor_sov:.1f}%)")
 
-def analyze_sov_simple(videos):
-    """Simple Share of Voice analysis"""
-    brands = [config.TARGET_BRAND] + config.COMPETITOR_BRANDS
-    total_mentions = {brand: 0 for brand in brands}
-    positive_mentions = {brand: 0 for brand in brands}
-    negative_mentions = {brand: 0 for brand in brands}
+def analyze_videos(videos, matcher=None):
+    """Share of Voice for videos, dropping duplicate and spam comments first if enabled"""
+    if matcher is None:
+        matcher = BrandMatcher()
     
-    total_comments = 0
+    comment_filter = None
+    if config.FILTER_COMMENTS:
+        comment_filter = CommentFilter(matcher)
+        videos = comment_filter.filter_videos(videos)
     
-    for video in videos:
-        comments = video.get('comments', [])
-        total_comments += len(comments)
-        
-        for comment in comments:
-            comment_text = comment.get('text', '').lower()
-            
-            # Check for brand mentions
-            for brand in brands:
-                if brand in comment_text:
-                    total_mentions[brand] += 1
-                    
-                    # Simple sentiment analysis
-                    sentiment = simple_sentiment_analysis(comment_text)
-                    if sentiment == 'positive':
-                        positive_mentions[brand] += 1
-                    elif sentiment == 'negative':
-                        negative_mentions[brand] += 1
+    if config.ANALYSIS_PROCESSES != 1:
+        results = analyze_sov_sharded(videos, matcher)
+    else:
+        results = analyze_sov_simple(videos, matcher)
     
-    # Calculate percentages
-    total_all_mentions = sum(total_mentions.values())
-    sov_percentages = {}
-    positive_sov = {}
+    if comment_filter:
+        results['filtered_comments'] = comment_filter.report()
+    return results
+
+def save_results(results, prefix):
+    """Save results to a timestamped JSON file and return its name"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{prefix}_{timestamp}.json"
     
-    for brand in brands:
-        if total_all_mentions > 0:
-            sov_percentages[brand] = (total_mentions[brand] / total_all_mentions) * 100
-        else:
-            sov_percentages[brand] = 0
-            
-        total_positive = sum(positive_mentions.values())
-        if total_positive > 0:
-            positive_sov[brand] = (positive_mentions[brand] / total_positive) * 100
-        else:
-            positive_sov[brand] = 0
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=2)
     
-    return {
-        'total_mentions': total_mentions,
-        'positive_mentions': positive_mentions,
-        'negative_mentions': negative_mentions,
-        'sov_percentages': sov_percentages,
-        'positive_sov': positive_sov,
-        'total_comments': total_comments,
-        'videos_analyzed': len(videos)
-    }
+    return filename
 
-def main():
-    """Main analysis function"""
-    print("🎯 Quick Atomberg Share of Voice Analysis")
+def run_batch_analysis(queries=None):
+    """Analyze several search queries in one run.
+    
+    All queries share one API client and one quota-aware rate limiter, and
+    videos returned by several queries are only fetched once.
+    """
+    if queries is None:
+        queries = config.SEARCH_QUERIES
+    
+    print("🎯 Batch Atomberg Share of Voice Analysis")
     print("=" * 50)
-    print(f"Search Query: {config.SEARCH_QUERY}")
+    print(f"Search Queries: {', '.join(queries)}")
     print(f"Target Brand: {config.TARGET_BRAND}")
     print(f"Competitors: {', '.join(config.COMPETITOR_BRANDS)}")
-    print(f"Top N Results: {config.TOP_N_RESULTS}")
+    print(f"Top N Results: {config.TOP_N_RESULTS} per query")
     print("=" * 50)
     
+    get_profile().start_deep()
     try:
-        # Search for videos
-        print("\n🔍 Searching YouTube for smart fan videos...")
-        videos = search_youtube_videos()
+        scraper = YouTubeScraper()
+        
+        print(f"\n🔍 Searching YouTube for {len(queries)} queries...")
+        videos_by_query = scraper.search_many(queries)
+        unique_videos = {
+            video['video_id']: video
+            for videos in videos_by_query.values()
+            for video in videos
+        }
         
-        if not videos:
-            print("❌ No videos found. Please check your search query and API key.")
+        if not unique_videos:
+            print("❌ No videos found. Please check your search queries and API key.")
             return
         
-        print(f"✅ Found {len(videos)} videos")
+        print(f"✅ Found {len(unique_videos)} unique videos")
+        
+        if config.ARCHIVE_RAW:
+            archive = RawArchive()
+            for query, videos in videos_by_query.items():
+                archive.write(videos, query)
         
-        # Analyze Share of Voice
         print("\n🧠 Analyzing Share of Voice...")
-        results = analyze_sov_simple(videos)
+        matcher = BrandMatcher()
+        results = {
+            'queries': {
+                query: analyze_videos(videos, matcher)
+                for query, videos in videos_by_query.items()
+            },
+            'combined': analyze_videos(unique_videos.values(), matcher),
+            'quota_units_used': scraper.rate_limiter.units_charged
+        }
         
-        # Display results
-        print("\n📊 Share of Voice Results:")
+        print("\n🔎 Per-Query Share of Voice:")
         print("-" * 40)
+        for query, query_results in results['queries'].items():
+            sov = query_results['sov_percentages'][config.TARGET_BRAND]
+            print(f"• '{query}': {config.TARGET_BRAND.title()} {sov:.1f}% "
+                  f"({query_results['videos_analyzed']} videos)")
         
-        for brand in [config.TARGET_BRAND] + config.COMPETITOR_BRANDS:
-            mentions = results['total_mentions'][brand]
-            sov = results['sov_percentages'][brand]
-            positive_sov = results['positive_sov'][brand]
-            
-            print(f"• {brand.title()}: {sov:.1f}% ({mentions} mentions)")
-            print(f"  - Positive SoV: {positive_sov:.1f}%")
-        
-        print(f"\n📈 Summary:")
-        print(f"• Total videos analyzed: {results['videos_analyzed']}")
-        print(f"• Total comments analyzed: {results['total_comments']}")
-        print(f"• Total brand mentions: {sum(results['total_mentions'].values())}")
-        
-        # Generate insights
-        atomberg_sov = results['sov_percentages'][config.TARGET_BRAND]
-        competitors = {k: v for k, v in results['sov_percentages'].items() if k != config.TARGET_BRAND}
-        top_competitor = max(competitors, key=competitors.get) if competitors else None
+        print("\n🌐 Combined Results")
+        display_results(results['combined'])
+        print(f"• Quota units used: {results['quota_units_used']}")
         
-        print(f"\n💡 Key Insights:")
-        print(f"• {config.TARGET_BRAND.title()} has {atomberg_sov:.1f}% Share of Voice")
-        if top_competitor:
-            competitor_sov = results['sov_percentages'][top_competitor]
-            print(f"• Top competitor: {top_competitor.title()} ({competitor_sov:.1f}%)")
+        filename = save_results(results, "batch_analysis")
+        print(f"\n✅ Batch analysis complete! Results saved to: {filename}")
+        print(f"⏱️  Run profile saved to: {write_profile(filename)}")
+        return results
         
-        # Save results
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"quick_analysis_{timestamp}.json"
+    except Exception as e:
+        print(f"❌ Batch analysis failed: {e}")
+        print("Please check your YouTube API key in the .env file")
+
+def main():
+    """Main analysis function"""
+    print("🎯 Quick Atomberg Share of Voice Analysis")
+    print("=" * 50)
+    print(f"Search Query: {config.SEARCH_QUERY}")
+    print(f"Target Brand: {config.TARGET_BRAND}")
+    print(f"Competitors: {', '.join(config.COMPETITOR_BRANDS)}")
+    print(f"Top N Results: {config.TOP_N_RESULTS}")
+    print("=" * 50)
+    
+    get_profile().start_deep()
+    try:
+        if config.INCREMENTAL:
+            # Only fetch comments posted since the last run
+            print("\n🔍 Fetching new comments on smart fan videos...")
+            state = CrawlState()
+            results = analyze_sov_incremental(stream_new_youtube_comments(state), state)
+            state.save()
+            print(f"✅ Found {results['new_comments']} new comments")
+        else:
+            # Search for videos
+            print("\n🔍 Searching YouTube for smart fan videos...")
+            videos = search_youtube_videos()
+            
+            if not videos:
+                print("❌ No videos found. Please check your search query and API key.")
+                return
+            
+            print(f"✅ Found {len(videos)} videos")
+            
+            # Analyze Share of Voice
+            print("\n🧠 Analyzing Share of Voice...")
+            results = analyze_videos(videos)
         
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+        display_results(results)
+        filename = save_results(results, "quick_analysis")
         
         print(f"\n✅ Analysis complete! Results saved to: {filename}")
+        print(f"⏱️  Run profile saved to: {write_profile(filename)}")
         
     except Exception as e:
         print(f"❌ Analysis failed: {e}")
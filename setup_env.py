@@ -12,15 +12,74 @@ def create_env_file():
     env_content = """# YouTube API Configuration
 YOUTUBE_API_KEY=YOUR_YOUTUBE_API_KEY_HERE
 
+# Offline Replay Configuration ("synthetic" or a recorded cache path)
+YOUTUBE_REPLAY=
+REPLAY_VIDEOS=200
+REPLAY_COMMENTS=20000
+REPLAY_LATENCY_MS=0
+REPLAY_ERROR_RATE=0
+
 # Ollama Configuration (for CrewAI)
 OLLAMA_BASE_URL=http://localhost:11434
 OLLAMA_MODEL=gemma3:1b
+LLM_TOP_COMMENTS=3
+LLM_COMMENT_CHARS=200
+LLM_PARALLEL_BRANDS=false
+LLM_CONCURRENCY=2
+LLM_TIMEOUT=600
+LLM_CACHE_ENABLED=true
+LLM_CACHE_MAX_MB=50
 
 # Analysis Configuration
 SEARCH_QUERY=smart fan
+SEARCH_QUERIES=smart fan
 TOP_N_RESULTS=50
 TARGET_BRAND=atomberg
 COMPETITOR_BRANDS=crompton,havells,orient,usha,bajaj
+BRAND_ALIASES=atomberg:atom berg|atomburg,havells:havels|havell
+SOV_TIME_BUCKET=day
+ANALYSIS_PROCESSES=1
+ANALYSIS_CHUNK_SIZE=5000
+SENTIMENT_BACKEND=lexicon
+SENTIMENT_BATCH_SIZE=256
+SENTIMENT_CACHE_SIZE=100000
+FILTER_COMMENTS=true
+FILTER_NEAR_DUPLICATES=true
+FILTER_AUTHOR_LIMIT=20
+
+# Collection Configuration
+MAX_WORKERS=8
+DAILY_QUOTA_UNITS=10000
+API_REQUESTS_PER_SECOND=10
+API_MAX_RETRIES=5
+COMMENTS_PER_VIDEO=100
+MAX_TOTAL_COMMENTS=0
+INCLUDE_REPLIES=false
+KEEP_VIDEO_DETAILS=false
+INCREMENTAL=false
+ARCHIVE_RAW=false
+ARCHIVE_DIR=data/archive
+
+# Service Configuration
+SERVICE_HOST=127.0.0.1
+SERVICE_PORT=8765
+SERVICE_WINDOW_HOURS=168
+SERVICE_REFRESH_MINUTES=60
+
+# Cache Configuration
+CACHE_ENABLED=true
+CACHE_PATH=.cache/youtube_api.sqlite
+QUOTA_PATH=.cache/youtube_api.sqlite
+CACHE_MAX_MB=200
+FORCE_REFRESH=false
+
+# HTTP Configuration
+HTTP_POOL_SIZE=10
+HTTP_TIMEOUT=30
+HTTP_RETRIES=3
+
+# Profiling Configuration ("cprofile" or "tracemalloc")
+PROFILE_MODE=
 """
     
     with open('.env', 'w') as f:
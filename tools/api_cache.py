@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+import config
+
+class ApiCache:
+    """Persistent SQLite cache for YouTube API responses.
+
+    Also holds LLM stage outputs, stored under the 'llm' endpoint.
+    Entries are keyed by endpoint and request parameters, expire after a
+    per-endpoint TTL, and the least recently used entries are evicted once
+    the stored responses exceed max_bytes.
+    """
+
+    def __init__(self, path: str = None, ttls: Dict[str, int] = None, max_bytes: int = None):
+        self.path = path or config.CACHE_PATH
+        self.ttls = ttls if ttls is not None else config.CACHE_TTLS
+        self.max_bytes = max_bytes if max_bytes is not None else config.CACHE_MAX_MB * 1024 * 1024
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # One connection shared by the scraper's worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(endpoint: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps([endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict]:
+        """Return the cached response, or None if missing or expired"""
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            response, created_at = row
+            if now - created_at > self.ttls.get(endpoint, 0):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(response)
+    
+    def set(self, endpoint: str, params: Dict[str, Any], response: Dict):
+        """Store a response and evict old entries if the cache is over size"""
+        if self.ttls.get(endpoint, 0) <= 0:
+            return
+        
+        key = self.make_key(endpoint, params)
+        payload = json.dumps(response, separators=(',', ':'))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, payload, len(payload), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+    
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
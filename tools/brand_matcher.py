@@ -0,0 +1,63 @@
+import re
+from typing import Dict, List, Set
+import config
+
+class BrandMatcher:
+    """Finds every tracked brand in a text with a single regex scan.
+
+    All brand names and aliases are compiled into one trie-shaped pattern
+    with word boundaries, so matching cost grows with the text rather than
+    with the number of brands, and "orient" no longer matches "oriented".
+    Whitespace inside an alias matches any run of whitespace.
+    """
+
+    def __init__(self, brands: List[str] = None, aliases: Dict[str, List[str]] = None):
+        if brands is None:
+            brands = [config.TARGET_BRAND] + config.COMPETITOR_BRANDS
+        if aliases is None:
+            aliases = config.BRAND_ALIASES
+        
+        self.brands = list(brands)
+        # Normalized surface form -> canonical brand
+        self._lookup: Dict[str, str] = {}
+        for brand in self.brands:
+            for name in [brand] + list(aliases.get(brand, [])):
+                self._lookup[self._normalize(name)] = brand
+        
+        self._pattern = re.compile(
+            r'(?<![a-z0-9])' + self._trie_pattern(self._lookup) + r'(?![a-z0-9])',
+            re.IGNORECASE
+        )
+    
+    @staticmethod
+    def _normalize(name: str) -> str:
+        return ' '.join(name.lower().split())
+    
+    @staticmethod
+    def _trie_pattern(names) -> str:
+        """Build a regex that shares common prefixes between names"""
+        trie = {}
+        for name in names:
+            node = trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        def emit(node) -> str:
+            if list(node) == ['']:
+                return ''
+            optional = '' in node
+            branches = [
+                (r'\s+' if char == ' ' else re.escape(char)) + emit(child)
+                for char, child in sorted(node.items()) if char
+            ]
+            pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            if optional:
+                pattern = '(?:' + pattern + ')?'
+            return pattern
+        
+        return emit(trie) if trie else r'(?!)'
+    
+    def find_brands(self, text: str) -> Set[str]:
+        """Return the set of brands mentioned in text"""
+        return {self._lookup[self._normalize(match.group())] for match in self._pattern.finditer(text)}
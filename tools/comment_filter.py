@@ -0,0 +1,208 @@
+"""
+Duplicate and spam filtering between the scraper and the SoV analysis
+Copy-pasted promos and bot comments are dropped before they can inflate
+brand mentions, with per-brand counts of what was removed
+"""
+
+import re
+import zlib
+import random
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from tools.brand_matcher import BrandMatcher
+from tools.sentiment import plain_text, tokenize, text_key
+from tools.profiling import count
+import config
+
+# Matched against lowercased plain text. Only promo context counts: viewers
+# routinely mention WhatsApp support or link a retailer, so neither a bare
+# messenger name nor an ordinary link is spam on its own. Small patterns,
+# each run only when the text holds a word it needs, scan much faster than
+# one large alternation
+SCAM_PATTERN = re.compile(r'giveaway|free iphone|earn money|work from home')
+# Self-promotion; every phrase contains "my " or "link"
+SELF_PROMO_PATTERN = re.compile(
+    r'subscribe to my|check (?:out )?my (?:channel|page|profile)|visit my (?:channel|page|profile|website|site|store)|'
+    r'click (?:the|my|this) link|link in (?:my )?bio|use my (?:promo|referral|coupon) code'
+)
+# Invitations to message the poster
+INVITE_PATTERN = re.compile(r'(?:dm|text|message|inbox|whatsapp|telegram) me\b')
+# A messenger group to join, or a messenger name followed by a phone number
+MESSENGER_PATTERN = re.compile(r'join (?:my|our) (?:whatsapp|telegram)|(?:whatsapp|telegram)\W{0,3}(?:\+|\d{5})')
+# Shortened and chat-invite links
+SHORT_LINK_PATTERN = re.compile(
+    r'(?:bit\.ly|tinyurl\.com|cutt\.ly|rb\.gy|is\.gd|t\.me|wa\.me|chat\.whatsapp\.com|linktr\.ee)/'
+)
+# Ten or more of the same symbol or emoji in a row
+REPEATED_SYMBOLS_PATTERN = re.compile(r'([^\w\s])\1{9}')
+
+# MinHash signature layout: NUM_PERM = BANDS * ROWS. Two comments share a
+# band with probability ~1 - (1 - J^ROWS)^BANDS for word-shingle Jaccard J,
+# i.e. ~99% at J=0.9, ~77% at J=0.8 and ~3% at J=0.5
+BANDS = 8
+ROWS = 8
+NUM_PERM = BANDS * ROWS
+SHINGLE_SIZE = 3
+MASK64 = (1 << 64) - 1
+
+class CommentFilter:
+    """Drops exact duplicates, near-duplicates and likely spam from a video stream.
+
+    - Exact duplicates: same normalized text (text_key) as an earlier comment.
+    - Near-duplicates: MinHash over word 3-shingles with LSH banding, so
+      each lookup is a few set probes however many comments were seen.
+    - Spam: self-promotion, invitations to message the poster, shortened
+      or chat-invite links, scam phrases, runs of one symbol or emoji, or
+      an author posting more than author_limit comments. Checks run on the
+      text without its HTML markup.
+    
+    The exact-duplicate keys, the LSH index and the per-author counts each
+    keep two generations of index_size entries, dropping the older one when
+    the newer fills. That bounds memory on million-comment crawls, at the
+    cost of forgetting comments and authors last seen two generations ago.
+    
+    The first copy of a comment is always kept. One filter should see one
+    analysis's videos, since a video analyzed twice would look duplicated.
+    """
+
+    def __init__(self, matcher: BrandMatcher = None, near_duplicates: bool = None,
+                 min_tokens: int = 5, author_limit: int = None, index_size: int = 200_000, seed: int = 0):
+        self.matcher = matcher or BrandMatcher()
+        self.near_duplicates = config.FILTER_NEAR_DUPLICATES if near_duplicates is None else near_duplicates
+        self.min_tokens = min_tokens
+        self.author_limit = author_limit if author_limit is not None else config.FILTER_AUTHOR_LIMIT
+        self.index_size = index_size
+        
+        # Two generations each of exact-duplicate keys, LSH band keys and
+        # author counts; the older one is dropped when the newer fills
+        self._seen_old = set()
+        self._seen_new = set()
+        self._bands_old = set()
+        self._bands_new = set()
+        self._indexed = 0
+        self._authors_old = Counter()
+        self._authors_new = Counter()
+        
+        rng = random.Random(seed)
+        # Odd multipliers and offsets for multiply-add hashing modulo 2^64
+        self._multipliers = [rng.getrandbits(64) | 1 for _ in range(NUM_PERM)]
+        self._offsets = [rng.getrandbits(64) for _ in range(NUM_PERM)]
+        if np is not None:
+            self._np_multipliers = np.array(self._multipliers, dtype=np.uint64)[:, None]
+            self._np_offsets = np.array(self._offsets, dtype=np.uint64)[:, None]
+        
+        self.kept = 0
+        self.removed = Counter()
+        self.removed_by_brand: Dict[str, Counter] = {brand: Counter() for brand in self.matcher.brands}
+    
+    def filter_videos(self, videos) -> Iterator[Dict]:
+        """Yield copies of videos whose comments are filtered lazily"""
+        for video in videos:
+            filtered = dict(video)
+            filtered['comments'] = self._filtering(video, filtered)
+            yield filtered
+    
+    def filter_list(self, videos) -> List[Dict]:
+        """Filter eagerly, for callers that walk the videos more than once"""
+        return [dict(video, comments=list(video['comments'])) for video in self.filter_videos(videos)]
+    
+    def _filtering(self, video: Dict, filtered: Dict) -> Iterator[Dict]:
+        for comment in video.get('comments', []):
+            reason = self.check(comment)
+            if reason is None:
+                self.kept += 1
+                yield comment
+            else:
+                self._remove(comment, reason)
+        # Streamed videos are flagged once their comments are consumed
+        if video.get('unfinished'):
+            filtered['unfinished'] = video['unfinished']
+    
+    def check(self, comment: Dict) -> Optional[str]:
+        """Why comment should be dropped ('duplicate', 'spam', 'near_duplicate'), or None to keep it"""
+        text = comment.get('text', '')
+        key = text_key(text)
+        if key in self._seen_new or key in self._seen_old:
+            return 'duplicate'
+        self._seen_new.add(key)
+        if len(self._seen_new) >= self.index_size:
+            self._seen_old, self._seen_new = self._seen_new, set()
+        
+        plain = plain_text(text)
+        if self._is_spam(plain, comment.get('author')):
+            return 'spam'
+        
+        if self.near_duplicates:
+            tokens = tokenize(plain)
+            if len(tokens) >= self.min_tokens and self._seen_similar(tokens):
+                return 'near_duplicate'
+        return None
+    
+    def _is_spam(self, text: str, author: str) -> bool:
+        if author:
+            self._authors_new[author] += 1
+            posted = self._authors_new[author] + self._authors_old[author]
+            if len(self._authors_new) >= self.index_size:
+                self._authors_old, self._authors_new = self._authors_new, Counter()
+            if self.author_limit and posted > self.author_limit:
+                return True
+        lowered = text.lower()
+        if SCAM_PATTERN.search(lowered) or REPEATED_SYMBOLS_PATTERN.search(text):
+            return True
+        if ('my ' in lowered or 'link' in lowered) and SELF_PROMO_PATTERN.search(lowered):
+            return True
+        if ' me' in lowered and INVITE_PATTERN.search(lowered):
+            return True
+        if ('whatsapp' in lowered or 'telegram' in lowered) and MESSENGER_PATTERN.search(lowered):
+            return True
+        return '/' in lowered and SHORT_LINK_PATTERN.search(lowered) is not None
+    
+    def _signature(self, tokens: List[str]) -> List[int]:
+        """MinHash signature of the text's word shingles"""
+        shingles = {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+        # crc32 rather than hash(), which is salted per process, so runs are reproducible
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+        if np is not None:
+            values = np.array(hashes, dtype=np.uint64)[None, :]
+            return (values * self._np_multipliers + self._np_offsets).min(axis=1).tolist()
+        return [
+            min((multiplier * value + offset) & MASK64 for value in hashes)
+            for multiplier, offset in zip(self._multipliers, self._offsets)
+        ]
+    
+    def _seen_similar(self, tokens: List[str]) -> bool:
+        """Check the LSH index for a similar comment, then index this one"""
+        signature = self._signature(tokens)
+        keys = [hash((band, tuple(signature[band * ROWS:(band + 1) * ROWS]))) for band in range(BANDS)]
+        if any(key in self._bands_new or key in self._bands_old for key in keys):
+            return True
+        
+        self._bands_new.update(keys)
+        self._indexed += 1
+        if self._indexed >= self.index_size:
+            self._bands_old, self._bands_new = self._bands_new, set()
+            self._indexed = 0
+        return False
+    
+    def _remove(self, comment: Dict, reason: str):
+        self.removed[reason] += 1
+        count(f'comments_removed.{reason}')
+        for brand in self.matcher.find_brands(comment.get('text', '')):
+            self.removed_by_brand[brand][reason] += 1
+    
+    def report(self) -> Dict:
+        """Comments kept and removed, overall and per brand mentioned"""
+        return {
+            'kept': self.kept,
+            'removed': dict(self.removed),
+            'removed_total': sum(self.removed.values()),
+            'removed_by_brand': {
+                brand: dict(reasons) for brand, reasons in self.removed_by_brand.items()
+            }
+        }
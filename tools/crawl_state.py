@@ -0,0 +1,53 @@
+import os
+import json
+from typing import Dict, Any
+import config
+
+class CrawlState:
+    """Persistent state for incremental crawls.
+
+    Holds a per-video watermark (the newest comment already counted) and the
+    running mention and sentiment counters, so each run only has to fetch
+    and analyze comments posted since the previous one.
+    """
+
+    def __init__(self, path: str = None, load: bool = True):
+        self.path = path or config.STATE_PATH
+        self.watermarks: Dict[str, Dict[str, str]] = {}
+        self.counters: Dict[str, Any] = {
+            'total_mentions': {},
+            'positive_mentions': {},
+            'negative_mentions': {},
+            'total_comments': 0
+        }
+        # load=False starts empty, e.g. for state that only lives in memory
+        if load:
+            self.load()
+    
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.watermarks = data.get('watermarks', {})
+        self.counters.update(data.get('counters', {}))
+    
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Write to a temporary file first so a crash never leaves a torn state file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'watermarks': self.watermarks, 'counters': self.counters}, f, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def get_watermark(self, video_id: str) -> Dict[str, str]:
+        return self.watermarks.get(video_id)
+    
+    def set_watermark(self, video_id: str, comment: Dict):
+        self.watermarks[video_id] = {
+            'comment_id': comment['comment_id'],
+            'published_at': comment['published_at']
+        }
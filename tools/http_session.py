@@ -0,0 +1,76 @@
+"""
+Shared, pooled HTTP sessions for YouTube API calls and the Ollama health check
+Keeps TCP/TLS connections alive between requests. Both use the session
+without urllib3 retries: the scraper retries API calls itself, charging
+quota for every attempt. CrewAI's LLM requests use LiteLLM's own client
+"""
+
+import threading
+from typing import Dict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from tools.profiling import count
+import config
+
+# One pooled session with urllib3 retries and one without, created on first use
+_sessions: Dict[bool, requests.Session] = {}
+_session_lock = threading.Lock()
+
+def get_session(retries: bool = True) -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use.
+    
+    retries=False gives a session that never retries, e.g. for health
+    probes that should fail fast when the service is down.
+    """
+    with _session_lock:
+        session = _sessions.get(retries)
+        if session is None:
+            session = _sessions[retries] = _create_session(retries)
+        return session
+
+def _create_session(retries: bool) -> requests.Session:
+    retry = Retry(
+        total=config.HTTP_RETRIES,
+        backoff_factor=config.HTTP_BACKOFF,
+        status_forcelist=(500, 502, 503, 504),
+        # Only idempotent requests are resent
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        # Hand the last error response back so callers see the real status
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.HTTP_POOL_SIZE,
+        pool_maxsize=config.HTTP_POOL_SIZE,
+        max_retries=retry if retries else 0
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+class PooledHttp:
+    """httplib2-compatible wrapper so googleapiclient uses the pooled session"""
+
+    def __init__(self, session: requests.Session = None, timeout: float = None):
+        # No urllib3 retries: YouTubeScraper._execute_with_retry is the only retry layer
+        self.session = session or get_session(retries=False)
+        self.timeout = timeout if timeout is not None else config.HTTP_TIMEOUT
+    
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=5, connection_type=None):
+        import httplib2
+        
+        response = self.session.request(
+            method, uri, data=body, headers=headers,
+            timeout=self.timeout, allow_redirects=redirections > 0
+        )
+        # requests has already decoded the body, so drop the encoding headers
+        info = {
+            key.lower(): value for key, value in response.headers.items()
+            if key.lower() not in ('content-encoding', 'content-length')
+        }
+        info['status'] = str(response.status_code)
+        count('http_bytes_received', len(response.content))
+        return httplib2.Response(info), response.content
@@ -0,0 +1,181 @@
+"""
+Run-level instrumentation for the collection and analysis pipeline
+Timed spans and counters for each stage, written as a structured profile
+next to the results JSON, plus optional cProfile/tracemalloc deep dives
+"""
+
+import io
+import time
+import json
+import pstats
+import inspect
+import threading
+import functools
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+import config
+
+class RunProfile:
+    """Spans and counters collected over one run.
+
+    A span accumulates call count, total and maximum seconds under a name
+    such as 'youtube.get_videos_stats'. Totals are summed over calls, so
+    spans running on several worker threads can add up to more than the
+    run's wall time. Counters are plain named sums (API calls, quota units,
+    bytes received, LLM tokens, ...).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans: Dict[str, Dict] = {}
+        self.counters: Dict[str, float] = {}
+        # Results of the cProfile/tracemalloc hook, if it ran
+        self.deep: Dict = {}
+        self._deep_mode = None
+        self._cprofile = None
+    
+    def record(self, name: str, seconds: float, calls: int = 1):
+        with self._lock:
+            span = self.spans.setdefault(name, {'calls': 0, 'total_s': 0.0, 'max_s': 0.0})
+            span['calls'] += calls
+            span['total_s'] += seconds
+            span['max_s'] = max(span['max_s'], seconds)
+    
+    def count(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+    
+    def start_deep(self, mode: str = None):
+        """Start cProfile or tracemalloc (mode, default config.PROFILE_MODE)"""
+        mode = mode if mode is not None else config.PROFILE_MODE
+        if mode == 'cprofile':
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif mode == 'tracemalloc':
+            import tracemalloc
+            tracemalloc.start(10)
+        elif mode:
+            raise ValueError(f"Unknown PROFILE_MODE {mode!r}: use 'cprofile' or 'tracemalloc'")
+        self._deep_mode = mode or None
+    
+    def stop_deep(self, prof_path: str = None):
+        """Stop the deep profiler and keep its summary; cProfile stats go to prof_path"""
+        if self._deep_mode == 'cprofile':
+            self._cprofile.disable()
+            if prof_path:
+                self._cprofile.dump_stats(prof_path)
+                self.deep['cprofile_stats'] = prof_path
+            buffer = io.StringIO()
+            pstats.Stats(self._cprofile, stream=buffer).sort_stats('cumulative').print_stats(25)
+            # cProfile only sees the thread that started it, not scraper workers
+            self.deep['cprofile_top'] = buffer.getvalue().splitlines()
+            self._cprofile = None
+        elif self._deep_mode == 'tracemalloc':
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            self.deep['tracemalloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            self.deep['tracemalloc_top'] = [str(stat) for stat in snapshot.statistics('lineno')[:15]]
+            tracemalloc.stop()
+        self._deep_mode = None
+    
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = {name: dict(span) for name, span in self.spans.items()}
+            counters = dict(self.counters)
+        
+        derived = {}
+        analysis_seconds = sum(span['total_s'] for name, span in spans.items() if name.startswith('analysis.'))
+        if analysis_seconds > 0:
+            derived['comments_analyzed_per_s'] = counters.get('comments_analyzed', 0) / analysis_seconds
+        llm_seconds = sum(span['total_s'] for name, span in spans.items() if name.startswith('llm.'))
+        if llm_seconds > 0:
+            derived['llm_tokens_per_s'] = counters.get('llm_total_tokens', 0) / llm_seconds
+        
+        return {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'wall_s': time.perf_counter() - self._start,
+            'spans': dict(sorted(spans.items(), key=lambda item: -item[1]['total_s'])),
+            'counters': dict(sorted(counters.items())),
+            'derived': derived,
+            'deep': self.deep
+        }
+
+_profile = RunProfile()
+
+def get_profile() -> RunProfile:
+    """The profile of the current run"""
+    return _profile
+
+def reset_profile() -> RunProfile:
+    """Start a fresh profile, e.g. between runs in one process"""
+    global _profile
+    _profile = RunProfile()
+    return _profile
+
+def count(name: str, amount: float = 1):
+    _profile.count(name, amount)
+
+def span(name: str):
+    return _profile.span(name)
+
+def timed(name: str):
+    """Decorator recording each call as a span.
+
+    For generator functions, only the time spent producing items is counted,
+    not the time the consumer spends between them.
+    """
+    def decorate(function):
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                return _timed_generator(function(*args, **kwargs), name)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with _profile.span(name):
+                    return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _timed_generator(generator, name: str):
+    clock = time.perf_counter
+    elapsed = 0.0
+    try:
+        while True:
+            start = clock()
+            try:
+                item = next(generator)
+            except StopIteration:
+                elapsed += clock() - start
+                return
+            elapsed += clock() - start
+            yield item
+    finally:
+        generator.close()
+        _profile.record(name, elapsed)
+
+def profile_path(results_path: str) -> Path:
+    """Profile file written next to a results file: <name>_profile.json"""
+    results_path = Path(results_path)
+    return results_path.with_name(f"{results_path.stem}_profile.json")
+
+def write_profile(results_path: str) -> Path:
+    """Stop any running deep profiler and write the run profile next to results_path"""
+    path = profile_path(results_path)
+    if _profile._deep_mode:
+        _profile.stop_deep(str(path.with_suffix('.prof')))
+    with open(path, 'w') as f:
+        json.dump(_profile.to_dict(), f, indent=2)
+    return path
@@ -0,0 +1,152 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone
+import config
+
+# YouTube Data API v3 quota cost of one list request per endpoint
+ENDPOINT_COSTS = {
+    'search': 100,
+    'videos': 1,
+    'commentThreads': 1,
+    'comments': 1
+}
+
+class QuotaExceededError(Exception):
+    """Raised when a request would exceed the daily quota budget"""
+
+class QuotaRateLimiter:
+    """Token-bucket request pacing plus daily quota accounting.
+
+    One instance is shared by every request in a run, so parallel workers
+    and multiple queries draw from the same request rate and the same
+    units-per-day budget. The units used today are kept in a quota_usage
+    table in the SQLite database at path (default QUOTA_PATH, the API
+    cache), so hourly cron runs, batch runs and the service all draw from
+    one daily budget; an empty path keeps the count in this process only.
+    The budget resets at midnight Pacific time on YouTube's side; we
+    approximate that with the UTC date.
+    """
+
+    def __init__(self, units_per_day: int = None, requests_per_second: float = None, path: str = None):
+        self.units_per_day = units_per_day if units_per_day is not None else config.DAILY_QUOTA_UNITS
+        self.rate = requests_per_second if requests_per_second is not None else config.API_REQUESTS_PER_SECOND
+        self.path = path if path is not None else config.QUOTA_PATH
+        self.capacity = max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._units_charged = 0
+        self._day = self._today()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        
+        self._conn = None
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit, so each statement is its own transaction and
+            # other processes see a charge as soon as it is made
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS quota_usage (day TEXT PRIMARY KEY, units INTEGER NOT NULL)"
+            )
+        self._units_used = self._stored_units()
+    
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date()
+    
+    @property
+    def units_used(self) -> int:
+        """Units used today, by every run sharing path"""
+        return self._units_used
+    
+    @property
+    def units_charged(self) -> int:
+        """Units charged through this limiter, e.g. by one run"""
+        return self._units_charged
+    
+    @property
+    def units_remaining(self) -> int:
+        return max(0, self.units_per_day - self._units_used)
+    
+    def _stored_units(self) -> int:
+        if self._conn is None:
+            return 0
+        row = self._conn.execute(
+            "SELECT units FROM quota_usage WHERE day = ?", (self._day.isoformat(),)
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def _charge(self, cost: int) -> bool:
+        """Add cost to today's units unless that would exceed the budget"""
+        if self._conn is None:
+            if self._units_used + cost > self.units_per_day:
+                return False
+            self._units_used += cost
+        else:
+            day = self._day.isoformat()
+            self._conn.execute("INSERT OR IGNORE INTO quota_usage VALUES (?, 0)", (day,))
+            # Checked and added in one statement, so concurrent runs never overspend
+            charged = self._conn.execute(
+                "UPDATE quota_usage SET units = units + ? WHERE day = ? AND units + ? <= ?",
+                (cost, day, cost, self.units_per_day)
+            ).rowcount
+            self._units_used = self._stored_units()
+            if not charged:
+                return False
+        self._units_charged += cost
+        return True
+    
+    def pause(self, seconds: float):
+        """Hold back every caller for seconds, e.g. after a rate-limit response"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    
+    def exhaust(self):
+        """Mark today's budget as spent, e.g. after the API reports quotaExceeded"""
+        with self._lock:
+            if self._conn is not None:
+                day = self._day.isoformat()
+                self._conn.execute("INSERT OR IGNORE INTO quota_usage VALUES (?, 0)", (day,))
+                self._conn.execute("UPDATE quota_usage SET units = MAX(units, ?) WHERE day = ?",
+                                   (self.units_per_day, day))
+            self._units_used = max(self._units_used, self.units_per_day)
+    
+    def acquire(self, endpoint: str):
+        """Block until a request to endpoint may be sent and charge its quota cost"""
+        cost = ENDPOINT_COSTS.get(endpoint, 1)
+        while True:
+            with self._lock:
+                today = self._today()
+                if today != self._day:
+                    self._day = today
+                    self._units_used = self._stored_units()
+                
+                if self._units_used + cost > self.units_per_day:
+                    raise self._exhausted(endpoint, cost)
+                
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                    self._last_refill = now
+                    
+                    if self._tokens >= 1:
+                        # Another run may have spent the budget while this one waited
+                        if not self._charge(cost):
+                            raise self._exhausted(endpoint, cost)
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            
+            time.sleep(wait)
+    
+    def _exhausted(self, endpoint: str, cost: int) -> QuotaExceededError:
+        return QuotaExceededError(
+            f"Daily quota of {self.units_per_day} units exhausted "
+            f"({self._units_used} used, {endpoint} costs {cost})"
+        )
@@ -0,0 +1,126 @@
+"""
+Compressed, appendable archive of raw collected videos and comments
+Lets a new brand list or sentiment model re-analyze past crawls from disk
+"""
+
+import re
+import gzip
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List
+import config
+
+VIDEOS_FILE = 'videos.jsonl.gz'
+COMMENTS_FILE = 'comments.jsonl.gz'
+
+def query_slug(query: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-') or 'all'
+
+class RawArchive:
+    """Gzip-compressed JSON Lines store partitioned by query and collection date.
+
+    Layout: <root>/query=<slug>/date=<YYYY-MM-DD>/{videos,comments}.jsonl.gz.
+    Each write appends a new gzip member, so files grow without rewriting.
+    Comments are stored one per line, grouped by video in the same order
+    as the videos file, which lets read() stream both files in lockstep.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = Path(root or config.ARCHIVE_DIR)
+    
+    def partition(self, query: str, day: str = None) -> Path:
+        if day is None:
+            day = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        return self.root / f"query={query_slug(query)}" / f"date={day}"
+    
+    def tee(self, videos, query: str, day: str = None) -> Iterator[Dict]:
+        """Yield videos unchanged while appending them and their comments to the archive.
+
+        Comments are written as the consumer iterates them, so streamed
+        crawls are archived without being held in memory.
+        """
+        directory = self.partition(query, day)
+        directory.mkdir(parents=True, exist_ok=True)
+        
+        with gzip.open(directory / VIDEOS_FILE, 'at', encoding='utf-8') as videos_out, \
+                gzip.open(directory / COMMENTS_FILE, 'at', encoding='utf-8') as comments_out:
+            for video in videos:
+                record = {key: value for key, value in video.items() if key != 'comments'}
+                videos_out.write(json.dumps(record, separators=(',', ':')) + '\n')
+                
+                archived = dict(video)
+                archived['comments'] = self._writing(
+                    video['video_id'], video.get('comments', []), comments_out
+                )
+                yield archived
+    
+    @staticmethod
+    def _writing(video_id: str, comments, out) -> Iterator[Dict]:
+        for comment in comments:
+            line = dict(comment)
+            line['video_id'] = video_id
+            out.write(json.dumps(line, separators=(',', ':')) + '\n')
+            yield comment
+    
+    def write(self, videos: List[Dict], query: str, day: str = None) -> Path:
+        """Append fully collected videos to the archive and return the partition path"""
+        for video in self.tee(videos, query, day):
+            for _ in video['comments']:
+                pass
+        return self.partition(query, day)
+    
+    def partitions(self, query: str = None, start: str = None, end: str = None) -> List[Path]:
+        """Archived partitions, oldest first, optionally filtered by query and date range"""
+        pattern = f"query={query_slug(query)}" if query else "query=*"
+        found = []
+        for directory in self.root.glob(f"{pattern}/date=*"):
+            day = directory.name[len('date='):]
+            if (start is None or day >= start) and (end is None or day <= end):
+                found.append(directory)
+        return sorted(found, key=lambda directory: (directory.name, directory.parent.name))
+    
+    def read(self, query: str = None, start: str = None, end: str = None) -> Iterator[Dict]:
+        """Stream archived videos with lazily read comments, same shape as the scraper's output"""
+        for directory in self.partitions(query, start, end):
+            yield from self._read_partition(directory)
+    
+    @staticmethod
+    def _read_partition(directory: Path) -> Iterator[Dict]:
+        comments_path = directory / COMMENTS_FILE
+        comment_lines = gzip.open(comments_path, 'rt', encoding='utf-8') if comments_path.exists() else iter(())
+        # One-comment lookahead shared by every video's comment generator
+        pending = [None]
+        
+        def next_comment():
+            if pending[0] is not None:
+                comment, pending[0] = pending[0], None
+                return comment
+            line = next(comment_lines, None)
+            return json.loads(line) if line else None
+        
+        def video_comments(video_id):
+            while True:
+                comment = next_comment()
+                if comment is None:
+                    return
+                if comment['video_id'] != video_id:
+                    pending[0] = comment
+                    return
+                del comment['video_id']
+                yield comment
+        
+        try:
+            with gzip.open(directory / VIDEOS_FILE, 'rt', encoding='utf-8') as videos_in:
+                previous = None
+                for line in videos_in:
+                    # Skip whatever the consumer left of the previous video's comments
+                    if previous is not None:
+                        for _ in previous:
+                            pass
+                    video = json.loads(line)
+                    previous = video['comments'] = video_comments(video['video_id'])
+                    yield video
+        finally:
+            if hasattr(comment_lines, 'close'):
+                comment_lines.close()
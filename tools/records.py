@@ -0,0 +1,44 @@
+"""
+Compact in-memory records for collected comments
+A slotted class instead of a dict per comment, with author names interned
+so repeat commenters share one string
+"""
+
+import sys
+from collections.abc import Mapping
+
+class Comment(Mapping):
+    """A comment with read-only dict-style access.
+
+    Analysis code reads comments with comment['text'] or comment.get(...),
+    and archived or synthetic comments are plain dicts, so records behave
+    like a mapping of FIELDS. dict(comment) gives a JSON-ready copy.
+    """
+
+    FIELDS = ('comment_id', 'author', 'text', 'like_count', 'published_at')
+    __slots__ = FIELDS
+    
+    def __init__(self, comment_id: str, author: str, text: str, like_count: int = 0, published_at: str = None):
+        self.comment_id = comment_id
+        self.author = sys.intern(author) if author else author
+        self.text = text
+        self.like_count = like_count
+        self.published_at = published_at
+    
+    def __getitem__(self, key: str):
+        if key not in Comment.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default=None):
+        # Overridden because Mapping.get goes through __getitem__ and an exception handler
+        return getattr(self, key) if key in Comment.FIELDS else default
+    
+    def __iter__(self):
+        return iter(Comment.FIELDS)
+    
+    def __len__(self) -> int:
+        return len(Comment.FIELDS)
+    
+    def __repr__(self) -> str:
+        return f"Comment({dict(self)!r})"
@@ -0,0 +1,261 @@
+"""
+Offline stand-in for the YouTube Data API client
+Serves recorded or synthetic search, videos, commentThreads and comments
+responses so the scraper can run without an API key or network
+"""
+
+import json
+import time
+import zlib
+import random
+import sqlite3
+import threading
+from typing import Dict, List
+from googleapiclient.errors import HttpError
+from tools.api_cache import ApiCache
+import config
+
+SENTIMENT_WORDS = ['good', 'great', 'excellent', 'amazing', 'love', 'best', 'perfect',
+                   'bad', 'terrible', 'awful', 'hate', 'worst', 'poor', 'useless']
+FILLER_WORDS = ['fan', 'speed', 'noise', 'remote', 'bldc', 'power', 'bill', 'installation',
+                'price', 'service', 'summer', 'room', 'motor', 'warranty', 'quality']
+
+class SyntheticCorpus:
+    """Deterministic, lazily generated corpus of videos and comments.
+
+    Nothing is held in memory: every response is derived from the seed and
+    the requested ids and page tokens, so a corpus of 10k videos and 1M
+    comments costs the same to set up as a small one. Comments are spread
+    evenly over the videos and listed newest first, so relevance and time
+    order return the same sequence.
+    """
+
+    def __init__(self, videos: int = None, comments: int = None, brands: List[str] = None,
+                 replies_per_thread: int = 0, seed: int = None):
+        self.videos = videos if videos is not None else config.REPLAY_VIDEOS
+        self.comments = comments if comments is not None else config.REPLAY_COMMENTS
+        self.brands = brands if brands is not None else [config.TARGET_BRAND] + config.COMPETITOR_BRANDS
+        self.replies_per_thread = replies_per_thread
+        self.seed = seed if seed is not None else config.REPLAY_SEED
+    
+    @staticmethod
+    def video_id(index: int) -> str:
+        return f"vid{index:08d}"
+    
+    @staticmethod
+    def _video_index(video_id: str) -> int:
+        return int(video_id[3:])
+    
+    def comment_count(self, index: int) -> int:
+        base, extra = divmod(self.comments, self.videos) if self.videos else (0, 0)
+        return base + (1 if index < extra else 0)
+    
+    def _text(self, rng: random.Random) -> str:
+        words = rng.sample(FILLER_WORDS, 3)
+        if self.brands and rng.random() < 0.6:
+            words.insert(rng.randrange(4), rng.choice(self.brands))
+        if rng.random() < 0.5:
+            words.append(rng.choice(SENTIMENT_WORDS))
+        return ' '.join(words)
+    
+    @staticmethod
+    def _timestamp(seconds_ago: int) -> str:
+        return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1735689600 - seconds_ago))
+    
+    def _comment_resource(self, comment_id: str, rng: random.Random, seconds_ago: int) -> Dict:
+        return {
+            'id': comment_id,
+            'snippet': {
+                'authorDisplayName': f"user{rng.randrange(50000)}",
+                'textDisplay': self._text(rng),
+                'likeCount': int(rng.paretovariate(1.5)) - 1,
+                'publishedAt': self._timestamp(seconds_ago)
+            }
+        }
+    
+    @staticmethod
+    def _page(params: Dict, total: int, default_size: int):
+        """Slice bounds and next page token for an offset-based page token"""
+        start = int(params.get('pageToken') or 0)
+        end = min(total, start + int(params.get('maxResults') or default_size))
+        return start, end, (str(end) if end < total else None)
+    
+    def respond(self, endpoint: str, params: Dict) -> Dict:
+        handler = getattr(self, f"_{endpoint}", None)
+        if handler is None:
+            raise _http_error(404, 'notFound', f"Unknown endpoint {endpoint}")
+        return handler(params)
+    
+    def _search(self, params: Dict) -> Dict:
+        # Unlike the live API, a page is not capped at 50 results, so one
+        # search can cover the whole corpus. Each query starts at a different
+        # video, which gives overlapping queries partially shared results.
+        offset = zlib.crc32(params.get('q', '').encode('utf-8')) % self.videos if self.videos else 0
+        start, end, token = self._page(params, self.videos, 5)
+        items = []
+        for position in range(start, end):
+            index = (offset + position) % self.videos
+            items.append({
+                'id': {'kind': 'youtube#video', 'videoId': self.video_id(index)},
+                'snippet': {
+                    'title': f"{FILLER_WORDS[index % len(FILLER_WORDS)]} review #{index}",
+                    'description': f"Synthetic video {index} for {params.get('q', '')}",
+                    'channelTitle': f"channel{index % 97}",
+                    'publishedAt': self._timestamp(86400 * (index % 365)),
+                    'thumbnails': {'default': {'url': f"https://i.ytimg.com/vi/{self.video_id(index)}/default.jpg"}}
+                }
+            })
+        return {'items': items, 'nextPageToken': token} if token else {'items': items}
+    
+    def _videos(self, params: Dict) -> Dict:
+        items = []
+        for video_id in params.get('id', '').split(','):
+            index = self._video_index(video_id)
+            if not 0 <= index < self.videos:
+                continue
+            rng = random.Random(f"{self.seed}:stats:{index}")
+            views = int(rng.paretovariate(1.2) * 1000)
+            items.append({
+                'id': video_id,
+                'statistics': {
+                    'viewCount': str(views),
+                    'likeCount': str(views // 40),
+                    'commentCount': str(self.comment_count(index))
+                }
+            })
+        return {'items': items}
+    
+    def _commentThreads(self, params: Dict) -> Dict:
+        index = self._video_index(params['videoId'])
+        if not 0 <= index < self.videos:
+            raise _http_error(404, 'videoNotFound', f"Video {params['videoId']} not found")
+        
+        count = self.comment_count(index)
+        start, end, token = self._page(params, count, 20)
+        with_replies = 'replies' in params.get('part', '')
+        items = []
+        for position in range(start, end):
+            thread_id = f"c{index}x{position}"
+            rng = random.Random(f"{self.seed}:{thread_id}")
+            thread = {
+                'id': thread_id,
+                'snippet': {
+                    'topLevelComment': self._comment_resource(thread_id, rng, position * 60),
+                    'totalReplyCount': self.replies_per_thread
+                }
+            }
+            if with_replies and self.replies_per_thread:
+                inline = min(5, self.replies_per_thread)
+                thread['replies'] = {'comments': [self._reply(thread_id, n) for n in range(inline)]}
+            items.append(thread)
+        return {'items': items, 'nextPageToken': token} if token else {'items': items}
+    
+    def _comments(self, params: Dict) -> Dict:
+        start, end, token = self._page(params, self.replies_per_thread, 20)
+        items = [self._reply(params['parentId'], n) for n in range(start, end)]
+        return {'items': items, 'nextPageToken': token} if token else {'items': items}
+    
+    def _reply(self, thread_id: str, n: int) -> Dict:
+        reply_id = f"{thread_id}.r{n}"
+        return self._comment_resource(reply_id, random.Random(f"{self.seed}:{reply_id}"), n)
+
+class RecordedResponses:
+    """Responses recorded by a live run in an ApiCache database, served regardless of age"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+    
+    def respond(self, endpoint: str, params: Dict) -> Dict:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        row = conn.execute(
+            "SELECT response FROM responses WHERE key = ?", (ApiCache.make_key(endpoint, params),)
+        ).fetchone()
+        if row is None:
+            raise _http_error(404, 'notFound', f"No recorded {endpoint} response for {params}")
+        return json.loads(row[0])
+
+def _http_error(status: int, reason: str, message: str) -> HttpError:
+    import httplib2
+    
+    content = json.dumps({
+        'error': {'code': status, 'message': message, 'errors': [{'reason': reason, 'message': message}]}
+    }).encode('utf-8')
+    return HttpError(httplib2.Response({'status': status}), content)
+
+# Failures injected by ReplayYouTube, all of which the scraper retries
+INJECTED_ERRORS = [
+    (500, 'backendError'),
+    (503, 'backendError'),
+    (403, 'rateLimitExceeded'),
+]
+
+class _Request:
+    def __init__(self, client: 'ReplayYouTube', endpoint: str, params: Dict):
+        self.client = client
+        self.endpoint = endpoint
+        self.params = params
+    
+    def execute(self) -> Dict:
+        return self.client.execute(self.endpoint, self.params)
+
+class _Resource:
+    def __init__(self, client: 'ReplayYouTube', endpoint: str):
+        self.client = client
+        self.endpoint = endpoint
+    
+    def list(self, **params) -> _Request:
+        return _Request(self.client, self.endpoint, params)
+
+class ReplayYouTube:
+    """Drop-in for the discovery client returned by googleapiclient's build().
+
+    Pass it to YouTubeScraper(client=...). Every request sleeps for latency
+    seconds (plus up to jitter seconds) and fails with a retryable HttpError
+    with probability error_rate. The client is thread-safe, so one instance
+    serves all of the scraper's worker threads.
+    """
+
+    def __init__(self, source=None, latency: float = None, jitter: float = 0.0,
+                 error_rate: float = None, seed: int = None):
+        self.source = source or SyntheticCorpus()
+        self.latency = latency if latency is not None else config.REPLAY_LATENCY_MS / 1000
+        self.jitter = jitter
+        self.error_rate = error_rate if error_rate is not None else config.REPLAY_ERROR_RATE
+        self._rng = random.Random(seed if seed is not None else config.REPLAY_SEED)
+        self._lock = threading.Lock()
+        # Requests served per endpoint, including injected failures
+        self.calls: Dict[str, int] = {}
+    
+    def search(self) -> _Resource:
+        return _Resource(self, 'search')
+    
+    def videos(self) -> _Resource:
+        return _Resource(self, 'videos')
+    
+    def commentThreads(self) -> _Resource:
+        return _Resource(self, 'commentThreads')
+    
+    def comments(self) -> _Resource:
+        return _Resource(self, 'comments')
+    
+    def execute(self, endpoint: str, params: Dict) -> Dict:
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            failure = self._rng.choice(INJECTED_ERRORS) if self._rng.random() < self.error_rate else None
+        
+        if delay > 0:
+            time.sleep(delay)
+        if failure:
+            status, reason = failure
+            raise _http_error(status, reason, f"Injected {reason} from replay client")
+        return self.source.respond(endpoint, params)
+
+def replay_client_from_config() -> ReplayYouTube:
+    """Replay client selected by YOUTUBE_REPLAY: "synthetic" or a recorded cache path"""
+    if config.YOUTUBE_REPLAY == 'synthetic':
+        return ReplayYouTube(SyntheticCorpus())
+    return ReplayYouTube(RecordedResponses(config.YOUTUBE_REPLAY))
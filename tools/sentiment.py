@@ -0,0 +1,240 @@
+"""
+Pluggable comment sentiment backends
+Every backend scores texts in batches; the rules and transformer backends
+also cache scores by a hash of the normalized text. A positive score means
+positive sentiment, a negative score negative sentiment and 0 neutral.
+"""
+
+import re
+import html
+import math
+import hashlib
+import threading
+from typing import Dict, List
+import config
+
+# Simple positive/negative word lists
+POSITIVE_WORDS = frozenset(['good', 'great', 'excellent', 'amazing', 'love', 'best', 'perfect', 'awesome', 'fantastic', 'wonderful'])
+NEGATIVE_WORDS = frozenset(['bad', 'terrible', 'awful', 'worst', 'hate', 'disappointing', 'poor', 'horrible', 'useless', 'broken'])
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+def plain_text(text: str) -> str:
+    """textDisplay without its HTML: tags become spaces and entities such as &#39; are unescaped"""
+    if '<' not in text and '&' not in text:
+        return text
+    return html.unescape(TAG_PATTERN.sub(' ', text))
+
+def tokenize(text: str) -> List[str]:
+    """Split lowercased text into word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def sentiment_score(tokens: List[str]) -> int:
+    """Number of distinct positive words minus distinct negative words"""
+    words = set(tokens)
+    return len(words & POSITIVE_WORDS) - len(words & NEGATIVE_WORDS)
+
+def sentiment_label(score: float) -> str:
+    if score > 0:
+        return 'positive'
+    elif score < 0:
+        return 'negative'
+    else:
+        return 'neutral'
+
+def text_key(text: str) -> bytes:
+    """Cache key of a text: hash of its lowercased, whitespace-collapsed form"""
+    normalized = ' '.join(text.lower().split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+class SentimentBackend:
+    """Base class: subclasses implement _score_texts for a list of texts.
+
+    score_batch looks every text up in a cache keyed by text_key, scores the
+    misses in one call (each distinct text once) and remembers the results.
+    Once the cache holds cache_size entries the oldest are dropped first.
+    """
+
+    name = None
+    
+    def __init__(self, cache_size: int = None):
+        self.cache_size = cache_size if cache_size is not None else config.SENTIMENT_CACHE_SIZE
+        self._cache: Dict[bytes, float] = {}
+        self._lock = threading.Lock()
+    
+    def _score_texts(self, texts: List[str]) -> List[float]:
+        raise NotImplementedError
+    
+    def score_batch(self, texts: List[str]) -> List[float]:
+        if not self.cache_size:
+            return self._score_texts(texts)
+        
+        keys = [text_key(text) for text in texts]
+        cache = self._cache
+        scores = [cache.get(key) for key in keys]
+        missing = {}
+        for i, score in enumerate(scores):
+            if score is None:
+                missing.setdefault(keys[i], texts[i])
+        if not missing:
+            return scores
+        
+        fresh = dict(zip(missing, self._score_texts(list(missing.values()))))
+        scores = [fresh[key] if score is None else score for key, score in zip(keys, scores)]
+        with self._lock:
+            cache.update(fresh)
+            while len(cache) > self.cache_size:
+                del cache[next(iter(cache))]
+        return scores
+    
+    def score(self, text: str) -> float:
+        return self.score_batch([text])[0]
+
+class LexiconBackend(SentimentBackend):
+    """The original word-list scorer: distinct positive minus distinct negative words.
+
+    Hashing a text costs more than half as much as scoring it with the word
+    sets, so caching is off unless a cache_size is given.
+    """
+
+    name = 'lexicon'
+    
+    def __init__(self, cache_size: int = 0):
+        super().__init__(cache_size)
+    
+    def _score_texts(self, texts: List[str]) -> List[float]:
+        return [sentiment_score(tokenize(text)) for text in texts]
+
+# Valences on VADER's -4..4 scale for common and product-review words
+RULE_VALENCES = {
+    'good': 1.9, 'great': 3.1, 'excellent': 2.7, 'amazing': 2.8, 'love': 3.2, 'loved': 2.9,
+    'best': 3.2, 'perfect': 2.7, 'awesome': 3.1, 'fantastic': 2.6, 'wonderful': 2.7, 'nice': 1.8,
+    'happy': 2.7, 'superb': 3.1, 'impressive': 2.4, 'beautiful': 2.9, 'satisfied': 1.9,
+    'recommend': 1.5, 'recommended': 1.5, 'worth': 1.4, 'reliable': 1.8, 'helpful': 1.8,
+    'comfortable': 1.6, 'stylish': 1.8, 'efficient': 1.6, 'smooth': 1.2, 'silent': 1.0,
+    'quiet': 1.0, 'premium': 1.2, 'saves': 1.0, 'saving': 1.0, 'better': 1.9,
+    'bad': -2.5, 'terrible': -2.1, 'awful': -2.0, 'worst': -3.1, 'hate': -2.7, 'hated': -2.7,
+    'disappointing': -2.2, 'disappointed': -1.9, 'poor': -2.1, 'horrible': -2.5,
+    'useless': -1.8, 'broken': -2.1, 'noisy': -1.5, 'noise': -0.8, 'waste': -1.8,
+    'faulty': -1.9, 'defective': -2.0, 'slow': -1.0, 'expensive': -0.9, 'overpriced': -1.7,
+    'problem': -1.7, 'problems': -1.7, 'issue': -1.0, 'issues': -1.0, 'wobble': -1.3,
+    'wobbling': -1.3, 'regret': -2.0, 'refund': -0.8, 'complaint': -1.5, 'rude': -2.0,
+    'damaged': -1.9, 'fail': -2.0, 'failed': -2.0, 'dead': -1.6, 'worse': -2.1,
+}
+NEGATIONS = frozenset([
+    'not', 'no', 'never', 'none', 'nobody', 'nothing', 'neither', 'nor', 'without', 'hardly',
+    'cannot', 'cant', 'dont', 'doesnt', 'didnt', 'isnt', 'wasnt', 'arent', 'wont', 'wouldnt',
+    'shouldnt', 'couldnt', 'aint',
+])
+BOOSTERS = {
+    'very': 0.293, 'really': 0.293, 'extremely': 0.293, 'super': 0.293, 'so': 0.293,
+    'too': 0.293, 'absolutely': 0.293, 'totally': 0.293, 'highly': 0.293, 'incredibly': 0.293,
+    'slightly': -0.293, 'somewhat': -0.293, 'kinda': -0.293, 'barely': -0.293, 'bit': -0.293,
+}
+NEGATION_SCALAR = -0.74
+NEUTRAL_THRESHOLD = 0.05
+
+class RuleBackend(SentimentBackend):
+    """VADER-style rule scorer over whole word tokens.
+
+    Handles negation ("not good" is negative), intensifiers and dampeners
+    ("very good", "slightly noisy"), contrast ("good but noisy" weighs the
+    clause after "but" more) and exclamation marks. Returns VADER's compound
+    score in [-1, 1], with scores within +-0.05 reported as 0 (neutral).
+    """
+
+    name = 'rules'
+    
+    def _score_texts(self, texts: List[str]) -> List[float]:
+        return [self._score_text(text) for text in texts]
+    
+    @staticmethod
+    def _score_text(text: str) -> float:
+        # Unescaped first, or "don&#39;t" would split into don / 39 / t and never negate
+        text = plain_text(text)
+        tokens = [token.replace("'", '') for token in tokenize(text)]
+        valences = []
+        for i, token in enumerate(tokens):
+            valence = RULE_VALENCES.get(token)
+            if valence is None:
+                continue
+            # Intensifiers and negations up to three words back, fading with distance
+            for distance, scalar in ((1, 1.0), (2, 0.95), (3, 0.9)):
+                if i < distance:
+                    break
+                boost = BOOSTERS.get(tokens[i - distance])
+                if boost:
+                    valence += math.copysign(1, valence) * boost * scalar
+            if any(tokens[j] in NEGATIONS for j in range(max(0, i - 3), i)):
+                valence *= NEGATION_SCALAR
+            valences.append([i, valence])
+        
+        if 'but' in tokens:
+            pivot = tokens.index('but')
+            for entry in valences:
+                entry[1] *= 0.5 if entry[0] < pivot else 1.5
+        
+        total = sum(valence for _, valence in valences)
+        if total:
+            total += math.copysign(min(text.count('!'), 4) * 0.292, total)
+        compound = total / math.sqrt(total * total + 15)
+        return round(compound, 4) if abs(compound) >= NEUTRAL_THRESHOLD else 0.0
+
+class TransformerBackend(SentimentBackend):
+    """Small CPU transformer classifier (needs the optional transformers and torch packages).
+
+    The score is the predicted label's probability, signed by the label;
+    neutral labels and predictions below min_confidence score 0.
+    """
+
+    name = 'transformer'
+    
+    def __init__(self, model: str = None, batch_size: int = None, min_confidence: float = None,
+                 cache_size: int = None):
+        super().__init__(cache_size)
+        try:
+            from transformers import pipeline
+        except ImportError:
+            raise ImportError("The transformer sentiment backend needs transformers and torch: "
+                              "pip install transformers torch")
+        self.batch_size = batch_size or config.SENTIMENT_BATCH_SIZE
+        self.min_confidence = min_confidence if min_confidence is not None else config.SENTIMENT_MIN_CONFIDENCE
+        self._pipeline = pipeline('sentiment-analysis', model=model or config.SENTIMENT_MODEL, device=-1)
+    
+    def _score_texts(self, texts: List[str]) -> List[float]:
+        predictions = self._pipeline([plain_text(text) for text in texts], batch_size=self.batch_size,
+                                     truncation=True)
+        scores = []
+        for prediction in predictions:
+            label = prediction['label'].lower()
+            probability = prediction['score']
+            if probability < self.min_confidence or label.startswith('neu'):
+                scores.append(0.0)
+            elif label.startswith('pos') or label == 'label_1':
+                scores.append(probability)
+            else:
+                scores.append(-probability)
+        return scores
+
+BACKENDS = {
+    'lexicon': LexiconBackend,
+    'rules': RuleBackend,
+    'transformer': TransformerBackend,
+}
+
+_backends: Dict[str, SentimentBackend] = {}
+_backends_lock = threading.Lock()
+
+def get_backend(name: str = None) -> SentimentBackend:
+    """The process-wide backend called name (default config.SENTIMENT_BACKEND)"""
+    name = name or config.SENTIMENT_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown sentiment backend {name!r}: choose from {', '.join(BACKENDS)}")
+                backend = _backends[name] = BACKENDS[name]()
+    return backend
@@ -0,0 +1,344 @@
+"""
+Share of Voice analysis shared by the quick analysis and the CrewAI agents
+"""
+
+import heapq
+from itertools import islice
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
+
+from tools.brand_matcher import BrandMatcher
+from tools.crawl_state import CrawlState
+from tools.profiling import timed, count
+from tools.sentiment import plain_text, sentiment_label, SentimentBackend, get_backend
+import config
+
+def simple_sentiment_analysis(text):
+    """Sentiment label of one text from the configured backend"""
+    return sentiment_label(get_backend().score(text))
+
+def analyze_comment(comment: Dict, matcher: BrandMatcher, backend: SentimentBackend = None) -> Dict:
+    """Tag one comment with the brands it mentions and its sentiment.
+    
+    The text is scored once, however many brands it names. Use
+    analyze_comments for many comments, so the backend scores them in batches.
+    """
+    text = comment.get('text', '')
+    score = (backend or get_backend()).score(text)
+    return {
+        'brands': matcher.find_brands(text),
+        'sentiment': sentiment_label(score),
+        'score': score
+    }
+
+def analyze_comments(comments, matcher: BrandMatcher,
+                     backend: SentimentBackend = None) -> Iterator[Tuple[Dict, Dict]]:
+    """Yield (comment, record) pairs, with records as from analyze_comment.
+    
+    Sentiment is scored SENTIMENT_BATCH_SIZE comments per backend call,
+    which matters most for the transformer backend.
+    """
+    if backend is None:
+        backend = get_backend()
+    batch_size = config.SENTIMENT_BATCH_SIZE
+    
+    comments = iter(comments)
+    while True:
+        batch = list(islice(comments, batch_size))
+        if not batch:
+            return
+        scores = backend.score_batch([comment.get('text', '') for comment in batch])
+        for comment, score in zip(batch, scores):
+            yield comment, {
+                'brands': matcher.find_brands(comment.get('text', '')),
+                'sentiment': sentiment_label(score),
+                'score': score
+            }
+
+def iter_comment_records(videos, matcher: BrandMatcher = None) -> Iterator[Dict]:
+    """Yield a per-comment record (video, brands, sentiment, score) for downstream use"""
+    if matcher is None:
+        matcher = BrandMatcher()
+    
+    for video in videos:
+        for comment, record in analyze_comments(video.get('comments', []), matcher):
+            record['video_id'] = video.get('video_id')
+            record['comment_id'] = comment.get('comment_id')
+            record['like_count'] = comment.get('like_count', 0)
+            record['published_at'] = comment.get('published_at')
+            yield record
+
+@timed('analysis.analyze_sov_simple')
+def analyze_sov_simple(videos, matcher: BrandMatcher = None, bucket: str = None,
+                       backend: SentimentBackend = None):
+    """Simple Share of Voice analysis.
+    
+    Besides plain mention counts, the same pass accumulates mentions weighted
+    by comment likes and by video views, and mentions per day or week
+    (bucket, default config.SOV_TIME_BUCKET). Sentiment comes from backend,
+    default the one selected by config.SENTIMENT_BACKEND.
+    """
+    if matcher is None:
+        matcher = BrandMatcher()
+    if bucket is None:
+        bucket = config.SOV_TIME_BUCKET
+    if backend is None:
+        backend = get_backend()
+    counters = new_counters(matcher.brands)
+    unfinished_videos = {}
+    videos_analyzed = 0
+    
+    # Videos and their comments may be lazy streams, so count while iterating
+    for video in videos:
+        videos_analyzed += 1
+        count_comments(counters, video.get('comments', []), video.get('view_count', 0), matcher, bucket, backend)
+        
+        # Checked after the comments, since streamed videos are flagged as they fail
+        if video.get('unfinished'):
+            unfinished_videos[video.get('video_id')] = video['unfinished']
+    
+    count('comments_analyzed', counters['total_comments'])
+    return counters_to_results(matcher.brands, counters, videos_analyzed, unfinished_videos)
+
+def new_counters(brands) -> Dict:
+    """Empty mention counters, as filled by count_comments"""
+    return {
+        'total_mentions': {brand: 0 for brand in brands},
+        'positive_mentions': {brand: 0 for brand in brands},
+        'negative_mentions': {brand: 0 for brand in brands},
+        'like_weighted_mentions': {brand: 0 for brand in brands},
+        'view_weighted_mentions': {brand: 0 for brand in brands},
+        'mentions_over_time': {},
+        'total_comments': 0
+    }
+
+def count_comments(counters: Dict, comments, view_count: int, matcher: BrandMatcher, bucket: str,
+                   backend: SentimentBackend = None):
+    """Add one video's comments to counters, scoring their sentiment in batches"""
+    if backend is None:
+        backend = get_backend()
+    batch_size = config.SENTIMENT_BATCH_SIZE
+    brands = matcher.brands
+    total_mentions = counters['total_mentions']
+    positive_mentions = counters['positive_mentions']
+    negative_mentions = counters['negative_mentions']
+    like_weighted_mentions = counters['like_weighted_mentions']
+    view_weighted_mentions = counters['view_weighted_mentions']
+    mentions_over_time = counters['mentions_over_time']
+    total_comments = 0
+    
+    comments = iter(comments)
+    while True:
+        batch = list(islice(comments, batch_size))
+        if not batch:
+            break
+        scores = backend.score_batch([comment.get('text', '') for comment in batch])
+        
+        for comment, score in zip(batch, scores):
+            total_comments += 1
+            mentioned = matcher.find_brands(comment.get('text', ''))
+            if not mentioned:
+                continue
+            
+            # Every mention counts at least once, plus one per like
+            like_weight = 1 + comment.get('like_count', 0)
+            period = time_bucket(comment.get('published_at'), bucket)
+            period_mentions = mentions_over_time.get(period)
+            if period_mentions is None:
+                period_mentions = mentions_over_time[period] = {brand: 0 for brand in brands}
+            
+            # Attach the comment's sentiment to every brand it mentions
+            for brand in mentioned:
+                total_mentions[brand] += 1
+                if score > 0:
+                    positive_mentions[brand] += 1
+                elif score < 0:
+                    negative_mentions[brand] += 1
+                like_weighted_mentions[brand] += like_weight
+                view_weighted_mentions[brand] += view_count
+                period_mentions[brand] += 1
+    
+    counters['total_comments'] += total_comments
+
+def merge_counters(counters: Dict, partial: Dict):
+    """Add partial counters (e.g. from another process) into counters"""
+    for key in ('total_mentions', 'positive_mentions', 'negative_mentions',
+                'like_weighted_mentions', 'view_weighted_mentions'):
+        for brand, value in partial[key].items():
+            counters[key][brand] += value
+    for period, mentions in partial['mentions_over_time'].items():
+        period_mentions = counters['mentions_over_time'].setdefault(period, dict.fromkeys(mentions, 0))
+        for brand, value in mentions.items():
+            period_mentions[brand] += value
+    counters['total_comments'] += partial['total_comments']
+
+def counters_to_results(brands, counters: Dict, videos_analyzed: int, unfinished_videos: Dict) -> Dict:
+    """The analyze_sov_simple results dict for accumulated counters"""
+    results = calculate_sov(brands, counters['total_mentions'], counters['positive_mentions'],
+                            counters['negative_mentions'], counters['total_comments'], videos_analyzed)
+    results.update(calculate_engagement_sov(counters['like_weighted_mentions'],
+                                            counters['view_weighted_mentions'],
+                                            counters['mentions_over_time']))
+    results['unfinished_videos'] = unfinished_videos
+    return results
+
+@lru_cache(maxsize=4096)
+def _iso_week(day: str) -> str:
+    year, week, _ = datetime.strptime(day, '%Y-%m-%d').isocalendar()
+    return f"{year}-W{week:02d}"
+
+def time_bucket(published_at: str, bucket: str = 'day') -> str:
+    """Map an ISO 8601 timestamp to its day ('2025-08-07') or ISO week ('2025-W32')"""
+    if not published_at:
+        return 'unknown'
+    day = published_at[:10]
+    if bucket == 'week':
+        return _iso_week(day)
+    return day
+
+def share_of(counts: Dict[str, float]) -> Dict[str, float]:
+    """Each key's percentage of the total"""
+    total = sum(counts.values())
+    return {key: (count / total) * 100 if total > 0 else 0 for key, count in counts.items()}
+
+def calculate_sov(brands, total_mentions, positive_mentions, negative_mentions,
+                  total_comments, videos_analyzed):
+    """Build the results dict, including SoV percentages, from raw counters"""
+    total_all_mentions = sum(total_mentions.values())
+    sov_percentages = {}
+    positive_sov = {}
+    
+    for brand in brands:
+        if total_all_mentions > 0:
+            sov_percentages[brand] = (total_mentions[brand] / total_all_mentions) * 100
+        else:
+            sov_percentages[brand] = 0
+            
+        total_positive = sum(positive_mentions.values())
+        if total_positive > 0:
+            positive_sov[brand] = (positive_mentions[brand] / total_positive) * 100
+        else:
+            positive_sov[brand] = 0
+    
+    return {
+        'total_mentions': total_mentions,
+        'positive_mentions': positive_mentions,
+        'negative_mentions': negative_mentions,
+        'sov_percentages': sov_percentages,
+        'positive_sov': positive_sov,
+        'total_comments': total_comments,
+        'videos_analyzed': videos_analyzed
+    }
+
+def calculate_engagement_sov(like_weighted_mentions, view_weighted_mentions, mentions_over_time):
+    """Build the weighted and time-bucketed SoV entries of the results dict"""
+    periods = sorted(mentions_over_time)
+    return {
+        'like_weighted_sov': share_of(like_weighted_mentions),
+        'view_weighted_sov': share_of(view_weighted_mentions),
+        'mentions_over_time': {period: mentions_over_time[period] for period in periods},
+        'sov_over_time': {period: share_of(mentions_over_time[period]) for period in periods}
+    }
+
+def analyze_sov_incremental(videos, state: CrawlState, matcher: BrandMatcher = None):
+    """Share of Voice analysis that adds new comments to the counters in state.
+    
+    videos should only carry comments not yet counted, e.g. from
+    stream_new_youtube_comments(state). Percentages are recomputed from the
+    accumulated counters, so earlier comments are never re-analyzed.
+    """
+    if matcher is None:
+        matcher = BrandMatcher()
+    brands = matcher.brands
+    delta = analyze_sov_simple(videos, matcher)
+    counters = state.counters
+    
+    for key in ('total_mentions', 'positive_mentions', 'negative_mentions'):
+        for brand in brands:
+            counters[key][brand] = counters[key].get(brand, 0) + delta[key][brand]
+    counters['total_comments'] += delta['total_comments']
+    
+    results = calculate_sov(
+        brands,
+        {brand: counters['total_mentions'][brand] for brand in brands},
+        {brand: counters['positive_mentions'][brand] for brand in brands},
+        {brand: counters['negative_mentions'][brand] for brand in brands},
+        counters['total_comments'],
+        len(state.watermarks)
+    )
+    results['new_comments'] = delta['total_comments']
+    # Retried from the same watermark on the next run
+    results['unfinished_videos'] = delta['unfinished_videos']
+    return results
+
+def clean_comment_text(text: str, max_chars: int) -> str:
+    """Strip the HTML that textDisplay carries and truncate to max_chars"""
+    text = ' '.join(plain_text(text).split())
+    if len(text) > max_chars:
+        text = text[:max_chars - 1].rstrip() + '…'
+    return text
+
+def build_sov_summary(videos, results: Dict, matcher: BrandMatcher = None,
+                      top_comments: int = None, comment_chars: int = None) -> Dict:
+    """Compact, size-bounded SoV facts for LLM prompts.
+    
+    Holds the per-brand counts and shares from results plus each brand's
+    most-liked comments, so its size depends only on the number of brands,
+    never on how many comments were collected.
+    """
+    if matcher is None:
+        matcher = BrandMatcher()
+    if top_comments is None:
+        top_comments = config.LLM_TOP_COMMENTS
+    if comment_chars is None:
+        comment_chars = config.LLM_COMMENT_CHARS
+    
+    # Min-heaps of (likes, sequence, comment) per brand; only the comments
+    # that are kept get their sentiment scored, in one batch at the end
+    top = {brand: [] for brand in matcher.brands}
+    sequence = 0
+    # top_comments <= 0 leaves comments out of the prompt, so there is nothing to collect
+    if top_comments > 0:
+        for video in videos:
+            for comment in video.get('comments', []):
+                for brand in matcher.find_brands(comment.get('text', '')):
+                    sequence += 1
+                    entry = (comment.get('like_count', 0), sequence, comment)
+                    if len(top[brand]) < top_comments:
+                        heapq.heappush(top[brand], entry)
+                    elif entry[0] > top[brand][0][0]:
+                        heapq.heapreplace(top[brand], entry)
+    
+    kept = [entry for entries in top.values() for entry in entries]
+    scores = get_backend().score_batch([comment.get('text', '') for _, _, comment in kept])
+    sentiments = {sequence: sentiment_label(score) for (_, sequence, _), score in zip(kept, scores)}
+    
+    brands = {}
+    for brand in matcher.brands:
+        brands[brand] = {
+            'mentions': results['total_mentions'][brand],
+            'positive_mentions': results['positive_mentions'][brand],
+            'negative_mentions': results['negative_mentions'][brand],
+            'sov_percent': round(results['sov_percentages'][brand], 1),
+            'positive_sov_percent': round(results['positive_sov'][brand], 1),
+            'top_comments': [
+                {
+                    'text': clean_comment_text(comment.get('text', ''), comment_chars),
+                    'likes': likes,
+                    'sentiment': sentiments[sequence]
+                }
+                for likes, sequence, comment in sorted(top[brand], reverse=True)
+            ]
+        }
+        if 'like_weighted_sov' in results:
+            brands[brand]['like_weighted_sov_percent'] = round(results['like_weighted_sov'][brand], 1)
+            brands[brand]['view_weighted_sov_percent'] = round(results['view_weighted_sov'][brand], 1)
+    
+    return {
+        'target_brand': config.TARGET_BRAND,
+        'videos_analyzed': results['videos_analyzed'],
+        'total_comments': results['total_comments'],
+        'total_mentions': sum(results['total_mentions'].values()),
+        'brands': brands
+    }
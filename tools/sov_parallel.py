@@ -0,0 +1,97 @@
+"""
+Sharded Share of Voice analysis across a process pool
+Splits the comment stream into chunks, counts each chunk in a worker
+process and merges the partial counters into analyze_sov_simple's results
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Tuple
+
+from tools.brand_matcher import BrandMatcher
+from tools.sov_analysis import new_counters, count_comments, merge_counters, counters_to_results
+from tools.sentiment import get_backend
+from tools.profiling import timed, count
+import config
+
+# Set once per worker process by _init_worker
+_worker_matcher = None
+_worker_bucket = None
+_worker_backend = None
+
+def _init_worker(matcher: BrandMatcher, bucket: str, backend_name: str):
+    global _worker_matcher, _worker_bucket, _worker_backend
+    _worker_matcher = matcher
+    _worker_bucket = bucket
+    # Each worker builds its own backend (and cache) rather than unpickling a model
+    _worker_backend = get_backend(backend_name)
+
+def _count_chunk(chunk: List[Tuple[int, List[Dict]]]) -> Dict:
+    """Partial counters for a chunk of (view_count, comments) groups"""
+    counters = new_counters(_worker_matcher.brands)
+    for view_count, comments in chunk:
+        count_comments(counters, comments, view_count, _worker_matcher, _worker_bucket, _worker_backend)
+    return counters
+
+def _chunks(videos, chunk_size: int, unfinished_videos: Dict, seen: List):
+    """Group the comment stream into chunks of about chunk_size comments.
+
+    A video's comments may be split across chunks; each piece carries the
+    video's view count. Videos are counted and unfinished flags collected
+    in the parent process as the stream is consumed.
+    """
+    chunk, size = [], 0
+    for video in videos:
+        seen[0] += 1
+        view_count = video.get('view_count', 0)
+        group = []
+        for comment in video.get('comments', []):
+            group.append(comment)
+            size += 1
+            if size >= chunk_size:
+                chunk.append((view_count, group))
+                yield chunk
+                chunk, group, size = [], [], 0
+        if group:
+            chunk.append((view_count, group))
+        if video.get('unfinished'):
+            unfinished_videos[video.get('video_id')] = video['unfinished']
+    if chunk:
+        yield chunk
+
+@timed('analysis.analyze_sov_sharded')
+def analyze_sov_sharded(videos, matcher: BrandMatcher = None, bucket: str = None,
+                        processes: int = None, chunk_size: int = None, backend_name: str = None) -> Dict:
+    """Multiprocess drop-in for analyze_sov_simple.
+
+    At most two chunks per worker are in flight, so a lazy stream of videos
+    is consumed at the pace of the workers and memory stays bounded.
+    """
+    if matcher is None:
+        matcher = BrandMatcher()
+    if bucket is None:
+        bucket = config.SOV_TIME_BUCKET
+    if processes is None:
+        processes = config.ANALYSIS_PROCESSES or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = config.ANALYSIS_CHUNK_SIZE
+    
+    counters = new_counters(matcher.brands)
+    unfinished_videos = {}
+    # Single-element list so the chunk generator can report how many videos it saw
+    seen = [0]
+    
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(matcher, bucket, backend_name or config.SENTIMENT_BACKEND)) as executor:
+        pending = set()
+        for chunk in _chunks(videos, chunk_size, unfinished_videos, seen):
+            if len(pending) >= 2 * processes:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    merge_counters(counters, future.result())
+            pending.add(executor.submit(_count_chunk, chunk))
+        for future in pending:
+            merge_counters(counters, future.result())
+    
+    count('comments_analyzed', counters['total_comments'])
+    return counters_to_results(matcher.brands, counters, seen[0], unfinished_videos)
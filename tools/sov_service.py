@@ -0,0 +1,289 @@
+"""
+Long-running Share of Voice service
+Keeps per-brand mention and sentiment counters over a sliding time window,
+refreshes them from the scraper on a schedule and serves them over a small
+local HTTP API
+"""
+
+import json
+import time
+import threading
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from tools.brand_matcher import BrandMatcher
+from tools.crawl_state import CrawlState
+from tools.sov_analysis import analyze_comments, calculate_sov, share_of
+from tools.youtube_scraper import YouTubeScraper
+import config
+
+class _Bucket:
+    """Counters for the comments published within one time bucket"""
+
+    __slots__ = ('comments', 'total', 'positive', 'negative', 'video_comments', 'video_mentions')
+    
+    def __init__(self):
+        self.comments = 0
+        self.total = Counter()
+        self.positive = Counter()
+        self.negative = Counter()
+        self.video_comments = Counter()
+        self.video_mentions: Dict[str, Counter] = {}
+
+class RollingSoV:
+    """Mention and sentiment counters over a sliding window of comment publish times.
+
+    Comments are added to hourly (bucket_seconds) buckets, and buckets that
+    fall out of the window are dropped whole, so memory is bounded by the
+    number of buckets rather than the number of comments seen.
+    """
+
+    def __init__(self, brands, window_seconds: float, bucket_seconds: int = 3600):
+        self.brands = list(brands)
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.buckets: Dict[int, _Bucket] = {}
+    
+    def add(self, video_id: str, timestamp: float, brands, score: int):
+        start = int(timestamp // self.bucket_seconds) * self.bucket_seconds
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            bucket = self.buckets[start] = _Bucket()
+        
+        bucket.comments += 1
+        bucket.video_comments[video_id] += 1
+        if not brands:
+            return
+        mentions = bucket.video_mentions.setdefault(video_id, Counter())
+        for brand in brands:
+            bucket.total[brand] += 1
+            mentions[brand] += 1
+            if score > 0:
+                bucket.positive[brand] += 1
+            elif score < 0:
+                bucket.negative[brand] += 1
+    
+    def expire(self, now: float):
+        """Drop buckets that ended before the window"""
+        cutoff = now - self.window_seconds
+        for start in [start for start in self.buckets if start + self.bucket_seconds <= cutoff]:
+            del self.buckets[start]
+    
+    def video_ids(self):
+        """Videos with at least one comment still in the window"""
+        video_ids = set()
+        for bucket in self.buckets.values():
+            video_ids.update(bucket.video_comments)
+        return video_ids
+    
+    def totals(self):
+        """Summed counters over the buckets still in the window"""
+        comments = 0
+        total, positive, negative, video_comments = Counter(), Counter(), Counter(), Counter()
+        video_mentions: Dict[str, Counter] = {}
+        for bucket in self.buckets.values():
+            comments += bucket.comments
+            total.update(bucket.total)
+            positive.update(bucket.positive)
+            negative.update(bucket.negative)
+            video_comments.update(bucket.video_comments)
+            for video_id, mentions in bucket.video_mentions.items():
+                video_mentions.setdefault(video_id, Counter()).update(mentions)
+        return comments, total, positive, negative, video_comments, video_mentions
+
+class SoVService:
+    """Scheduled refreshes into a RollingSoV plus pre-serialized HTTP responses.
+
+    Each refresh only pages through comments posted since the previous one,
+    and never further back than the window, so the first crawl after a start
+    fills the whole window. Watermarks are kept in memory and, like titles,
+    dropped once none of a video's comments are left in the window. A failed
+    search, or videos whose stats or comments could not be fetched, mark
+    /health as degraded until a refresh succeeds. After a refresh, every
+    response body is rebuilt and swapped in at once, so requests never
+    compute anything and never see a half-updated state.
+    """
+
+    def __init__(self, scraper: YouTubeScraper = None, matcher: BrandMatcher = None,
+                 window_hours: float = None, refresh_minutes: float = None):
+        self.scraper = scraper or YouTubeScraper()
+        self.matcher = matcher or BrandMatcher()
+        window_hours = window_hours if window_hours is not None else config.SERVICE_WINDOW_HOURS
+        refresh_minutes = refresh_minutes if refresh_minutes is not None else config.SERVICE_REFRESH_MINUTES
+        self.refresh_seconds = refresh_minutes * 60
+        self.rolling = RollingSoV(self.matcher.brands, window_hours * 3600)
+        self.state = CrawlState(load=False)
+        self.titles: Dict[str, str] = {}
+        self.last_refresh = None
+        self.last_error = None
+        # video_id -> reason for videos the last refresh could not fully fetch
+        self.unfinished: Dict[str, str] = {}
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        # path -> JSON body, replaced as a whole after each refresh
+        self._responses: Dict[str, bytes] = {}
+        self._publish(time.time())
+    
+    @staticmethod
+    def _timestamp(published_at: str, default: float) -> float:
+        try:
+            return datetime.fromisoformat(published_at.replace('Z', '+00:00')).timestamp()
+        except (AttributeError, ValueError):
+            return default
+    
+    def refresh(self) -> int:
+        """Fetch and count comments posted since the last refresh; returns how many.
+        
+        Raises if the search fails; videos that could not be fully fetched
+        are listed in unfinished and reported in last_error.
+        """
+        with self._refresh_lock:
+            now = time.time()
+            since = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now - self.rolling.window_seconds))
+            added = 0
+            unfinished = {}
+            for video in self.scraper.stream_new_comments(self.state, since=since, raise_errors=True):
+                video_id = video['video_id']
+                self.titles[video_id] = video.get('title', '')
+                for comment, record in analyze_comments(video['comments'], self.matcher):
+                    timestamp = self._timestamp(comment.get('published_at'), now)
+                    self.rolling.add(video_id, timestamp, record['brands'], record['score'])
+                    added += 1
+                # Checked after the comments, since streamed videos are flagged as they fail
+                if video.get('unfinished'):
+                    unfinished[video_id] = video['unfinished']
+            
+            self.rolling.expire(now)
+            self._prune()
+            self.unfinished = unfinished
+            self.last_error = f"{len(unfinished)} videos could not be fully fetched" if unfinished else None
+            self.last_refresh = now
+            self._publish(now)
+            return added
+    
+    def _prune(self):
+        """Forget titles and watermarks of videos with nothing left in the window.
+        
+        Any counted comment newer than the window start is still in a bucket,
+        so re-crawling a pruned video back to the window start counts nothing twice.
+        """
+        active = self.rolling.video_ids()
+        for video_id in [video_id for video_id in self.titles if video_id not in active]:
+            del self.titles[video_id]
+        for video_id in [video_id for video_id in self.state.watermarks if video_id not in active]:
+            del self.state.watermarks[video_id]
+    
+    def _publish(self, now: float):
+        brands = self.rolling.brands
+        comments, total, positive, negative, video_comments, video_mentions = self.rolling.totals()
+        
+        sov = calculate_sov(
+            brands,
+            {brand: total[brand] for brand in brands},
+            {brand: positive[brand] for brand in brands},
+            {brand: negative[brand] for brand in brands},
+            comments,
+            len(video_comments)
+        )
+        sov['window_hours'] = self.rolling.window_seconds / 3600
+        sov['last_refresh'] = self._iso(self.last_refresh)
+        
+        videos = {}
+        for video_id, count in video_comments.items():
+            mentions = video_mentions.get(video_id, Counter())
+            counts = {brand: mentions[brand] for brand in brands}
+            videos[video_id] = {
+                'title': self.titles.get(video_id, ''),
+                'comments': count,
+                'mentions': counts,
+                'sov_percentages': share_of(counts)
+            }
+        
+        health = {
+            'status': 'ok' if self.last_error is None else 'degraded',
+            'last_refresh': self._iso(self.last_refresh),
+            'last_error': self.last_error,
+            'unfinished_videos': self.unfinished,
+            'comments_in_window': comments,
+            'buckets': len(self.rolling.buckets)
+        }
+        
+        responses = {
+            '/sov': self._encode(sov),
+            '/videos': self._encode(videos),
+            '/health': self._encode(health)
+        }
+        for video_id, breakdown in videos.items():
+            responses[f'/videos/{video_id}'] = self._encode(breakdown)
+        self._responses = responses
+    
+    @staticmethod
+    def _iso(timestamp):
+        return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+    
+    @staticmethod
+    def _encode(payload) -> bytes:
+        return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    
+    def response(self, path: str):
+        """Pre-serialized body for path, or None"""
+        return self._responses.get(path.rstrip('/') or '/sov')
+    
+    def run_scheduler(self):
+        """Refresh every refresh_seconds until stop() is called"""
+        while not self._stop.is_set():
+            try:
+                added = self.refresh()
+                print(f"🔄 Refreshed Share of Voice: {added} new comments")
+                if self.last_error:
+                    print(f"⚠️  {self.last_error}")
+            except Exception as e:
+                self.last_error = str(e)
+                self._publish(time.time())
+                print(f"⚠️  Refresh failed: {e}")
+            self._stop.wait(self.refresh_seconds)
+    
+    def stop(self):
+        self._stop.set()
+    
+    def make_server(self, host: str = None, port: int = None) -> ThreadingHTTPServer:
+        host = host or config.SERVICE_HOST
+        port = port if port is not None else config.SERVICE_PORT
+        service = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = service.response(self.path.split('?', 1)[0])
+                if body is None:
+                    self.send_error(404, "Unknown path: try /sov, /videos, /videos/<id> or /health")
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return ThreadingHTTPServer((host, port), Handler)
+    
+    def serve_forever(self, host: str = None, port: int = None):
+        """Start the refresh scheduler and serve the HTTP API until interrupted"""
+        server = self.make_server(host, port)
+        scheduler = threading.Thread(target=self.run_scheduler, daemon=True)
+        scheduler.start()
+        print(f"🌐 Serving Share of Voice on http://{server.server_address[0]}:{server.server_address[1]}/sov")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            server.server_close()
+
+def serve():
+    """Run the SoV service with the configured window, schedule and address"""
+    SoVService().serve_forever()
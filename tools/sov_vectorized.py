@@ -0,0 +1,146 @@
+"""
+Vectorized Share of Voice engine for large comment corpora
+Loads comments into a columnar table and computes SoV with NumPy/pandas
+"""
+
+from typing import Dict, List
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = pd = None
+
+from tools.brand_matcher import BrandMatcher
+from tools.sov_analysis import analyze_comments, calculate_sov, calculate_engagement_sov
+import config
+
+MENTION_PREFIX = 'mention_'
+
+def _require_pandas():
+    if pd is None:
+        raise ImportError("The vectorized engine needs pandas and numpy: pip install pandas numpy")
+
+def mention_columns(brands: List[str]) -> List[str]:
+    return [f"{MENTION_PREFIX}{brand}" for brand in brands]
+
+def build_comment_table(videos, matcher: BrandMatcher = None) -> "pd.DataFrame":
+    """Load comments into a table with one row per comment.
+
+    Columns: video_id, view_count, text, like_count, published_at, score
+    (sentiment score) and one boolean mention_<brand> column per tracked
+    brand. Each
+    comment is tagged once with analyze_comments, which scores sentiment in
+    batches; everything after that is columnar.
+    """
+    _require_pandas()
+    if matcher is None:
+        matcher = BrandMatcher()
+    brand_index = {brand: i for i, brand in enumerate(matcher.brands)}
+    
+    video_ids, view_counts, texts, like_counts, published_at, scores = [], [], [], [], [], []
+    mention_rows, mention_cols = [], []
+    
+    for video in videos:
+        for comment, record in analyze_comments(video.get('comments', []), matcher):
+            row = len(texts)
+            video_ids.append(video.get('video_id'))
+            view_counts.append(video.get('view_count', 0))
+            texts.append(comment.get('text', ''))
+            like_counts.append(comment.get('like_count', 0))
+            published_at.append(comment.get('published_at'))
+            scores.append(record['score'])
+            for brand in record['brands']:
+                mention_rows.append(row)
+                mention_cols.append(brand_index[brand])
+    
+    mask = np.zeros((len(texts), len(matcher.brands)), dtype=bool)
+    mask[mention_rows, mention_cols] = True
+    
+    table = pd.DataFrame({
+        'video_id': pd.Series(video_ids, dtype='category'),
+        'view_count': np.asarray(view_counts, dtype=np.int64),
+        'text': texts,
+        'like_count': np.asarray(like_counts, dtype=np.int64),
+        'published_at': pd.to_datetime(published_at, utc=True, errors='coerce'),
+        'score': np.asarray(scores, dtype=np.float32),
+    })
+    masks = pd.DataFrame(mask, columns=mention_columns(matcher.brands))
+    return pd.concat([table, masks], axis=1)
+
+def analyze_sov_table(table: "pd.DataFrame", brands: List[str],
+                      videos_analyzed: int = None, bucket: str = None) -> Dict:
+    """Share of Voice over a comment table, same schema as analyze_sov_simple"""
+    _require_pandas()
+    if bucket is None:
+        bucket = config.SOV_TIME_BUCKET
+    mask = table[mention_columns(brands)].to_numpy(dtype=bool)
+    score = table['score'].to_numpy()
+    
+    total = mask.sum(axis=0)
+    positive = mask[score > 0].sum(axis=0)
+    negative = mask[score < 0].sum(axis=0)
+    
+    # Weighted mentions are weight vectors projected onto the brand mask
+    like_weighted = (table['like_count'].to_numpy() + 1) @ mask
+    view_weighted = table['view_count'].to_numpy() @ mask
+    
+    # Mentions per period, over comments that mention at least one brand
+    mentioned = mask.any(axis=1)
+    periods = _periods(table.loc[mentioned, 'published_at'], bucket)
+    over_time = pd.DataFrame(mask[mentioned], columns=brands).groupby(periods.to_numpy()).sum()
+    
+    if videos_analyzed is None:
+        videos_analyzed = int(table['video_id'].nunique())
+    
+    results = calculate_sov(
+        brands,
+        {brand: int(count) for brand, count in zip(brands, total)},
+        {brand: int(count) for brand, count in zip(brands, positive)},
+        {brand: int(count) for brand, count in zip(brands, negative)},
+        len(table),
+        videos_analyzed
+    )
+    results.update(calculate_engagement_sov(
+        {brand: int(weight) for brand, weight in zip(brands, like_weighted)},
+        {brand: int(weight) for brand, weight in zip(brands, view_weighted)},
+        {period: {brand: int(count) for brand, count in row.items()}
+         for period, row in over_time.iterrows()}
+    ))
+    return results
+
+def _periods(published_at: "pd.Series", bucket: str) -> "pd.Series":
+    """Vectorized equivalent of sov_analysis.time_bucket"""
+    if bucket == 'week':
+        iso = published_at.dt.isocalendar()
+        labels = iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)
+    else:
+        labels = published_at.dt.strftime('%Y-%m-%d')
+    return labels.where(published_at.notna(), 'unknown')
+
+def mentions_by_video(table: "pd.DataFrame", brands: List[str]) -> "pd.DataFrame":
+    """Per-video mention counts, one column per brand"""
+    _require_pandas()
+    counts = table.groupby('video_id', observed=True)[mention_columns(brands)].sum()
+    counts.columns = brands
+    return counts
+
+def analyze_sov_vectorized(videos, matcher: BrandMatcher = None) -> Dict:
+    """Vectorized drop-in for analyze_sov_simple"""
+    if matcher is None:
+        matcher = BrandMatcher()
+    
+    # Track videos as they stream past so ones without comments are included
+    seen = []
+    
+    def tracked(videos):
+        for video in videos:
+            seen.append(video)
+            yield video
+    
+    table = build_comment_table(tracked(videos), matcher)
+    results = analyze_sov_table(table, matcher.brands, len(seen))
+    results['unfinished_videos'] = {
+        video.get('video_id'): video['unfinished'] for video in seen if video.get('unfinished')
+    }
+    return results
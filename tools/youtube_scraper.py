@@ -1,109 +1,589 @@
 import os
 import json
-from typing import List, Dict, Any
-from googleapiclient.discovery import build
+import time
+import sys
+import random
+import threading
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator
+import requests
 from googleapiclient.errors import HttpError
+from tools.api_cache import ApiCache
+from tools.crawl_state import CrawlState
+from tools.rate_limiter import QuotaRateLimiter, QuotaExceededError, ENDPOINT_COSTS
+from tools.http_session import PooledHttp
+from tools.raw_archive import RawArchive
+from tools.records import Comment
+from tools.profiling import timed, count
 import config
 
+# Maximum number of ids accepted by a single videos().list request
+VIDEOS_BATCH_SIZE = 50
+
+# Maximum page size accepted by commentThreads().list and comments().list
+COMMENTS_PAGE_SIZE = 100
+
+# HTTP statuses and API error reasons worth retrying after a backoff
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+# Errors that leave a single video unfinished without aborting the run
+FETCH_ERRORS = (HttpError, QuotaExceededError, requests.RequestException)
+
 class YouTubeScraper:
-    def __init__(self):
+    def __init__(self, cache: ApiCache = None, force_refresh: bool = None,
+                 rate_limiter: QuotaRateLimiter = None, client=None):
         self.api_key = config.YOUTUBE_API_KEY
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
+        if client is None and config.YOUTUBE_REPLAY:
+            from tools.replay_client import replay_client_from_config
+            client = replay_client_from_config()
+        # Pass one limiter to several scrapers to make them share a quota budget;
+        # replayed requests are not charged to the stored daily usage
+        self.rate_limiter = rate_limiter or QuotaRateLimiter(path='' if client is not None else None)
+        # A shared, thread-safe client (e.g. ReplayYouTube) replaces the per-thread API clients
+        self.client = client
+        # Replayed responses never go into the real response cache
+        if cache is None and config.CACHE_ENABLED and client is None:
+            cache = ApiCache()
+        self.cache = cache
+        # Skip cache reads but still store fresh responses
+        self.force_refresh = config.FORCE_REFRESH if force_refresh is None else force_refresh
+        # Discovery clients are not thread-safe, so each worker thread gets
+        # its own client; all of them share the pooled HTTP session
+        self._local = threading.local()
+        # video_id -> reason for videos whose stats or comments are incomplete,
+        # cleared when a new search or stream starts
+        self.unfinished: Dict[str, str] = {}
+    
+    @property
+    def youtube(self):
+        """YouTube API client for the current thread"""
+        if self.client is not None:
+            return self.client
+        client = getattr(self._local, 'youtube', None)
+        if client is None:
+            # Deferred: importing discovery dominates start-up, and cached runs never need it
+            from googleapiclient.discovery import build
+            # The bundled discovery document avoids fetching it over the network
+            client = build('youtube', 'v3', developerKey=self.api_key, http=PooledHttp(),
+                           static_discovery=True, cache_discovery=False)
+            self._local.youtube = client
+        return client
+    
+    def _execute(self, endpoint: str, use_cache: bool = True, **params) -> Dict:
+        """Run a list request on an API endpoint, going through the cache"""
+        if use_cache and self.cache is not None and not self.force_refresh:
+            cached = self.cache.get(endpoint, params)
+            if cached is not None:
+                count(f'api_cache_hits.{endpoint}')
+                return cached
+        
+        response = self._execute_with_retry(endpoint, params)
+        count(f'items_received.{endpoint}', len(response.get('items', ())))
         
+        if use_cache and self.cache is not None:
+            self.cache.set(endpoint, params, response)
+        return response
+    
+    def _execute_with_retry(self, endpoint: str, params: Dict) -> Dict:
+        """Send a request, retrying transient failures with jittered exponential backoff.
+        
+        Rate-limit responses pause the shared limiter so every worker backs
+        off together; a quotaExceeded response marks the daily budget as spent.
+        """
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(endpoint)
+            count(f'api_calls.{endpoint}')
+            count('quota_units', ENDPOINT_COSTS.get(endpoint, 1))
+            try:
+                return getattr(self.youtube, endpoint)().list(**params).execute()
+            except HttpError as e:
+                reason = self._error_reason(e)
+                if reason in QUOTA_REASONS:
+                    self.rate_limiter.exhaust()
+                    raise QuotaExceededError(f"YouTube API quota exhausted ({reason})") from e
+                retryable = e.resp.status in RETRYABLE_STATUSES or reason in RATE_LIMIT_REASONS
+                if not retryable or attempt >= config.API_MAX_RETRIES:
+                    raise
+                delay = self._backoff_delay(attempt)
+                if e.resp.status == 429 or reason in RATE_LIMIT_REASONS:
+                    self.rate_limiter.pause(delay)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= config.API_MAX_RETRIES:
+                    raise
+                delay = self._backoff_delay(attempt)
+            
+            attempt += 1
+            count('api_retries')
+            time.sleep(delay)
+    
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """Full-jitter exponential backoff: uniform in [0, min(max, base * 2^attempt)]"""
+        return random.uniform(0, min(config.API_BACKOFF_MAX, config.API_BACKOFF_BASE * 2 ** attempt))
+    
+    @staticmethod
+    def _error_reason(error: HttpError) -> str:
+        """The first error reason reported by the API, e.g. 'quotaExceeded'"""
+        try:
+            details = json.loads(error.content.decode('utf-8'))['error']['errors']
+            return details[0].get('reason', '')
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            return ''
+    
+    def _mark_unfinished(self, video_id: str, stage: str, error: Exception):
+        """Record that a video's stats or comments could not be fully fetched"""
+        self.unfinished.setdefault(video_id, f"{stage}: {error}")
+    
+    @timed('youtube.search_videos')
     def search_videos(self, query: str = None, max_results: int = None) -> List[Dict]:
         """Search for videos on YouTube"""
-        if query is None:
-            query = config.SEARCH_QUERY
-        if max_results is None:
-            max_results = config.TOP_N_RESULTS
-            
+        self.unfinished = {}
         try:
-            # Search for videos
-            search_response = self.youtube.search().list(
-                q=query,
-                part='id,snippet',
-                maxResults=max_results,
-                type='video',
-                order='relevance'
-            ).execute()
+            items = self._search(query, max_results)
+            
+            # Get video statistics for all results in batched requests
+            all_stats = self.get_videos_stats([item['id']['videoId'] for item in items])
+            
+            # Get comments for all results concurrently
+            all_comments = self.get_comments_for_videos([item['id']['videoId'] for item in items])
             
             videos = []
-            for item in search_response['items']:
+            for item in items:
                 video_id = item['id']['videoId']
-                video_info = {
-                    'video_id': video_id,
-                    'title': item['snippet']['title'],
-                    'description': item['snippet']['description'],
-                    'channel_title': item['snippet']['channelTitle'],
-                    'published_at': item['snippet']['publishedAt'],
-                    'thumbnails': item['snippet']['thumbnails']
-                }
-                
-                # Get video statistics
-                stats = self.get_video_stats(video_id)
-                video_info.update(stats)
-                
-                # Get comments
-                comments = self.get_video_comments(video_id)
-                video_info['comments'] = comments
-                
+                video_info = self._video_info(item, all_stats[video_id])
+                video_info['comments'] = all_comments[video_id]
+                self._flag_unfinished(video_info)
                 videos.append(video_info)
-                
-            return videos
             
-        except HttpError as e:
+            return videos
+        
+        except FETCH_ERRORS as e:
             print(f"An error occurred: {e}")
             return []
     
+    @timed('youtube.search_many')
+    def search_many(self, queries: List[str], max_results: int = None) -> Dict[str, List[Dict]]:
+        """Search several queries and return their videos keyed by query.
+        
+        A video returned by more than one query is fetched once and the same
+        record appears in each query's list.
+        """
+        self.unfinished = {}
+        query_items = {}
+        for query in queries:
+            try:
+                query_items[query] = self._search(query, max_results)
+            except FETCH_ERRORS as e:
+                print(f"An error occurred searching '{query}': {e}")
+                query_items[query] = []
+        
+        unique_items = {}
+        for items in query_items.values():
+            for item in items:
+                unique_items.setdefault(item['id']['videoId'], item)
+        
+        video_ids = list(unique_items)
+        all_stats = self.get_videos_stats(video_ids)
+        all_comments = self.get_comments_for_videos(video_ids)
+        
+        videos = {}
+        for video_id, item in unique_items.items():
+            videos[video_id] = self._video_info(item, all_stats[video_id])
+            videos[video_id]['comments'] = all_comments[video_id]
+            self._flag_unfinished(videos[video_id])
+        
+        return {
+            query: [videos[item['id']['videoId']] for item in items]
+            for query, items in query_items.items()
+        }
+    
+    @timed('youtube.stream_videos')
+    def stream_videos(self, query: str = None, max_results: int = None,
+                      comments_per_video: int = None, max_total_comments: int = None,
+                      include_replies: bool = None) -> Iterator[Dict]:
+        """Search for videos and yield them with lazily fetched comments.
+
+        Each video's 'comments' is a generator that pages through the API as
+        it is consumed, so callers that process comments one at a time keep
+        memory flat. max_total_comments is shared by all videos in the stream.
+        """
+        if max_total_comments is None:
+            max_total_comments = config.MAX_TOTAL_COMMENTS
+        
+        self.unfinished = {}
+        try:
+            items = self._search(query, max_results)
+        except FETCH_ERRORS as e:
+            print(f"An error occurred: {e}")
+            return
+        
+        all_stats = self.get_videos_stats([item['id']['videoId'] for item in items])
+        # Single-element list so every video's generator draws from one budget
+        remaining = [max_total_comments or None]
+        
+        for item in items:
+            if remaining[0] is not None and remaining[0] <= 0:
+                break
+            video_id = item['id']['videoId']
+            video_info = self._video_info(item, all_stats[video_id])
+            video_info['comments'] = self._flagging(video_info, self._budgeted(
+                self.iter_video_comments(video_id, comments_per_video, include_replies),
+                remaining
+            ))
+            yield video_info
+    
+    @timed('youtube.search')
+    def _search(self, query: str = None, max_results: int = None) -> List[Dict]:
+        """Run a search request and return the raw result items"""
+        if query is None:
+            query = config.SEARCH_QUERY
+        if max_results is None:
+            max_results = config.TOP_N_RESULTS
+        
+        search_response = self._execute(
+            'search',
+            q=query,
+            part='id,snippet',
+            maxResults=max_results,
+            type='video',
+            order='relevance'
+        )
+        
+        return search_response['items']
+    
+    @staticmethod
+    def _video_info(item: Dict, stats: Dict) -> Dict:
+        """Build a video record from a search result item and its statistics.
+
+        Ids and channel names are interned, since they repeat across records
+        and dict keys; description and thumbnails are only kept with
+        KEEP_VIDEO_DETAILS, as nothing in the analysis reads them.
+        """
+        snippet = item['snippet']
+        video_info = {
+            'video_id': sys.intern(item['id']['videoId']),
+            'title': snippet['title'],
+            'channel_title': sys.intern(snippet['channelTitle']),
+            'published_at': snippet['publishedAt']
+        }
+        if config.KEEP_VIDEO_DETAILS:
+            video_info['description'] = snippet['description']
+            video_info['thumbnails'] = snippet['thumbnails']
+        video_info.update(stats)
+        return video_info
+    
+    def _flag_unfinished(self, video_info: Dict):
+        """Mark a video record whose stats or comments are incomplete"""
+        if video_info['video_id'] in self.unfinished:
+            video_info['unfinished'] = self.unfinished[video_info['video_id']]
+    
+    def _flagging(self, video_info: Dict, comments: Iterator[Dict]) -> Iterator[Dict]:
+        """Yield a streamed video's comments, flagging the video if fetching fails"""
+        yield from comments
+        self._flag_unfinished(video_info)
+    
+    @staticmethod
+    def _budgeted(comments: Iterator[Dict], remaining: List) -> Iterator[Dict]:
+        """Yield comments until the shared budget in remaining[0] runs out.
+        
+        The budget is checked before the next comment is pulled, so a spent
+        budget never triggers another page request.
+        """
+        try:
+            while remaining[0] is None or remaining[0] > 0:
+                comment = next(comments, None)
+                if comment is None:
+                    return
+                if remaining[0] is not None:
+                    remaining[0] -= 1
+                yield comment
+        finally:
+            comments.close()
+    
     def get_video_stats(self, video_id: str) -> Dict:
         """Get video statistics"""
-        try:
-            stats_response = self.youtube.videos().list(
-                part='statistics',
-                id=video_id
-            ).execute()
-            
-            if stats_response['items']:
-                stats = stats_response['items'][0]['statistics']
-                return {
-                    'view_count': int(stats.get('viewCount', 0)),
-                    'like_count': int(stats.get('likeCount', 0)),
-                    'comment_count': int(stats.get('commentCount', 0))
-                }
-        except HttpError as e:
-            print(f"Error getting stats for video {video_id}: {e}")
+        return self.get_videos_stats([video_id])[video_id]
+    
+    @timed('youtube.get_videos_stats')
+    def get_videos_stats(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """Get statistics for many videos, keyed by video_id.
+
+        The videos endpoint accepts up to 50 comma-separated ids per request,
+        so each batch costs one round trip and one quota unit.
+        """
+        all_stats = {video_id: self._empty_stats() for video_id in video_ids}
         
+        for start in range(0, len(video_ids), VIDEOS_BATCH_SIZE):
+            batch = video_ids[start:start + VIDEOS_BATCH_SIZE]
+            try:
+                stats_response = self._execute(
+                    'videos',
+                    part='statistics',
+                    id=','.join(batch)
+                )
+                
+                for item in stats_response['items']:
+                    stats = item['statistics']
+                    all_stats[item['id']] = {
+                        'view_count': int(stats.get('viewCount', 0)),
+                        'like_count': int(stats.get('likeCount', 0)),
+                        'comment_count': int(stats.get('commentCount', 0))
+                    }
+            except FETCH_ERRORS as e:
+                print(f"Error getting stats for videos {', '.join(batch)}: {e}")
+                for video_id in batch:
+                    self._mark_unfinished(video_id, 'stats', e)
+        
+        return all_stats
+    
+    @staticmethod
+    def _empty_stats() -> Dict:
         return {'view_count': 0, 'like_count': 0, 'comment_count': 0}
     
-    def get_video_comments(self, video_id: str, max_comments: int = 100) -> List[Dict]:
+    def get_video_comments(self, video_id: str, max_comments: int = None,
+                           include_replies: bool = None) -> List[Dict]:
         """Get comments for a video"""
-        comments = []
+        return list(self.iter_video_comments(video_id, max_comments, include_replies))
+    
+    @timed('youtube.iter_video_comments')
+    def iter_video_comments(self, video_id: str, max_comments: int = None,
+                            include_replies: bool = None) -> Iterator[Dict]:
+        """Yield comments for a video, following page tokens lazily.
+
+        Stops after max_comments comments (0 means no limit). Replies count
+        towards the limit when include_replies is set.
+        """
+        if max_comments is None:
+            max_comments = config.COMMENTS_PER_VIDEO
+        if include_replies is None:
+            include_replies = config.INCLUDE_REPLIES
+        
+        remaining = max_comments or None
+        page_token = None
         try:
-            comments_response = self.youtube.commentThreads().list(
-                part='snippet',
-                videoId=video_id,
-                maxResults=max_comments,
-                order='relevance'
-            ).execute()
-            
-            for item in comments_response['items']:
-                comment = item['snippet']['topLevelComment']['snippet']
-                comments.append({
-                    'author': comment['authorDisplayName'],
-                    'text': comment['textDisplay'],
-                    'like_count': comment['likeCount'],
-                    'published_at': comment['publishedAt']
-                })
+            while remaining is None or remaining > 0:
+                comments_response = self._execute(
+                    'commentThreads',
+                    part='snippet,replies' if include_replies else 'snippet',
+                    videoId=video_id,
+                    maxResults=min(COMMENTS_PAGE_SIZE, remaining or COMMENTS_PAGE_SIZE),
+                    order='relevance',
+                    pageToken=page_token
+                )
+                
+                for item in comments_response['items']:
+                    thread_comments = [self._comment(item['snippet']['topLevelComment'])]
+                    if include_replies:
+                        # Lazy, so reply pages past the limit are never requested
+                        thread_comments = chain(thread_comments, self._iter_replies(item))
+                    
+                    for comment in thread_comments:
+                        if remaining is not None:
+                            remaining -= 1
+                        yield comment
+                        if remaining is not None and remaining <= 0:
+                            return
+                
+                page_token = comments_response.get('nextPageToken')
+                if not page_token:
+                    break
+        
+        except FETCH_ERRORS as e:
+            print(f"Error getting comments for video {video_id}: {e}")
+            self._mark_unfinished(video_id, 'comments', e)
+    
+    @timed('youtube.stream_new_comments')
+    def stream_new_comments(self, state: CrawlState, query: str = None, max_results: int = None,
+                            since: str = None, raise_errors: bool = False) -> Iterator[Dict]:
+        """Search for videos and yield them with only the comments posted since
+        the watermarks stored in state (and not before since, if given).
+        
+        A failed search ends the stream quietly unless raise_errors is set,
+        for callers such as the service that must report it.
+        """
+        self.unfinished = {}
+        try:
+            items = self._search(query, max_results)
+        except FETCH_ERRORS as e:
+            if raise_errors:
+                raise
+            print(f"An error occurred: {e}")
+            return
+        
+        all_stats = self.get_videos_stats([item['id']['videoId'] for item in items])
+        
+        for item in items:
+            video_id = item['id']['videoId']
+            video_info = self._video_info(item, all_stats[video_id])
+            video_info['comments'] = self._flagging(video_info, self.iter_new_comments(video_id, state, since=since))
+            yield video_info
+    
+    @timed('youtube.iter_new_comments')
+    def iter_new_comments(self, video_id: str, state: CrawlState,
+                          max_comments: int = None, since: str = None) -> Iterator[Dict]:
+        """Yield top-level comments newer than the video's watermark, newest first.
+        
+        Pages are requested in time order, uncached, and paging stops as soon as
+        the watermark is reached. A video's new comments are only yielded once
+        every page has been fetched: if a page fails, nothing from the video is
+        counted and the next run fetches it again from the same watermark. The
+        watermark only advances once the stream has been consumed completely.
+        max_comments only caps the first crawl of a video, since capping later
+        runs would leave gaps behind the watermark. With since (an ISO 8601 UTC
+        timestamp), paging also stops at older comments and the first crawl
+        pages all the way back to since instead of stopping at max_comments.
+        """
+        if max_comments is None:
+            max_comments = config.COMMENTS_PER_VIDEO
+        
+        watermark = state.get_watermark(video_id)
+        remaining = None if watermark or since else (max_comments or None)
+        new_comments = []
+        page_token = None
+        try:
+            while remaining is None or remaining > 0:
+                comments_response = self._execute(
+                    'commentThreads',
+                    use_cache=False,
+                    part='snippet',
+                    videoId=video_id,
+                    maxResults=min(COMMENTS_PAGE_SIZE, remaining or COMMENTS_PAGE_SIZE),
+                    order='time',
+                    pageToken=page_token
+                )
                 
-        except HttpError as e:
+                for item in comments_response['items']:
+                    comment = self._comment(item['snippet']['topLevelComment'])
+                    if watermark and (comment['comment_id'] == watermark['comment_id']
+                                      or comment['published_at'] < watermark['published_at']):
+                        page_token = None
+                        break
+                    if since and comment['published_at'] < since:
+                        page_token = None
+                        break
+                    
+                    if remaining is not None:
+                        if remaining <= 0:
+                            break
+                        remaining -= 1
+                    new_comments.append(comment)
+                else:
+                    page_token = comments_response.get('nextPageToken')
+                
+                if not page_token:
+                    break
+        
+        except FETCH_ERRORS as e:
+            # Drop the partial fetch and leave the watermark alone so the next run retries this video
             print(f"Error getting comments for video {video_id}: {e}")
+            self._mark_unfinished(video_id, 'comments', e)
+            return
         
-        return comments
+        yield from new_comments
+        if new_comments:
+            state.set_watermark(video_id, new_comments[0])
+    
+    @timed('youtube.iter_replies')
+    def _iter_replies(self, thread: Dict) -> Iterator[Dict]:
+        """Yield replies to a comment thread.
 
-def search_youtube_videos():
+        commentThreads only embeds a few replies, so longer threads are paged
+        through the comments endpoint.
+        """
+        inline_replies = thread.get('replies', {}).get('comments', [])
+        if len(inline_replies) >= thread['snippet'].get('totalReplyCount', 0):
+            for reply in inline_replies:
+                yield self._comment(reply)
+            return
+        
+        page_token = None
+        while True:
+            replies_response = self._execute(
+                'comments',
+                part='snippet',
+                parentId=thread['id'],
+                maxResults=COMMENTS_PAGE_SIZE,
+                pageToken=page_token
+            )
+            
+            for reply in replies_response['items']:
+                yield self._comment(reply)
+            
+            page_token = replies_response.get('nextPageToken')
+            if not page_token:
+                break
+    
+    @staticmethod
+    def _comment(resource: Dict) -> Comment:
+        """Build a compact comment record from a comment resource"""
+        snippet = resource['snippet']
+        return Comment(
+            resource['id'],
+            snippet['authorDisplayName'],
+            snippet['textDisplay'],
+            snippet['likeCount'],
+            snippet['publishedAt']
+        )
+    
+    @timed('youtube.get_comments_for_videos')
+    def get_comments_for_videos(self, video_ids: List[str], max_comments: int = None,
+                                max_workers: int = None) -> Dict[str, List[Dict]]:
+        """Get comments for many videos in parallel, keyed by video_id.
+
+        At most max_workers requests are in flight at once. Results keep the
+        order of video_ids, and a failure on one video yields an empty list
+        for that video only.
+        """
+        if max_workers is None:
+            max_workers = config.MAX_WORKERS
+        
+        all_comments = {video_id: [] for video_id in video_ids}
+        if not video_ids:
+            return all_comments
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {
+                video_id: executor.submit(self.get_video_comments, video_id, max_comments)
+                for video_id in all_comments
+            }
+            for video_id, future in futures.items():
+                try:
+                    all_comments[video_id] = future.result()
+                except Exception as e:
+                    print(f"Error getting comments for video {video_id}: {e}")
+                    self._mark_unfinished(video_id, 'comments', e)
+        
+        return all_comments
+
+def search_youtube_videos(archive: bool = None):
     """Main function to search YouTube videos"""
+    if archive is None:
+        archive = config.ARCHIVE_RAW
+    scraper = YouTubeScraper()
+    videos = scraper.search_videos()
+    if archive:
+        RawArchive().write(videos, config.SEARCH_QUERY)
+    return videos
+
+def stream_youtube_videos(archive: bool = None):
+    """Search YouTube videos and stream their comments page by page"""
+    if archive is None:
+        archive = config.ARCHIVE_RAW
+    scraper = YouTubeScraper()
+    videos = scraper.stream_videos()
+    if archive:
+        # Comments are archived as they are consumed
+        return RawArchive().tee(videos, config.SEARCH_QUERY)
+    return videos
+
+def stream_new_youtube_comments(state: CrawlState):
+    """Search YouTube videos and stream comments posted since the last run"""
     scraper = YouTubeScraper()
-    return scraper.search_videos()
+    return scraper.stream_new_comments(state)
 
 if __name__ == "__main__":
     videos = search_youtube_videos()